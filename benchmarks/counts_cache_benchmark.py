@@ -0,0 +1,72 @@
+"""Compares pd.read_csv with cold and warm loads through the columnar counts cache.
+
+Run from the repository root:
+
+    $ python -m benchmarks.counts_cache_benchmark --genes 60000 --samples 1000
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class FakeUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile"""
+
+    def __init__(self, data, name, file_id):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--genes", type=int, default=60000)
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["UPLOAD_STORE_DIR"] = os.path.join(workdir, "uploads")
+    from utils.counts_cache import load_counts
+
+    rng = np.random.default_rng(0)
+    counts = pd.DataFrame(
+        rng.negative_binomial(5, 0.01, size=(args.genes, args.samples)),
+        columns=[f"TCGA-{i:04d}-01A" for i in range(args.samples)],
+    )
+    counts.insert(0, "Ensembl_ID", [f"ENSG{i:011d}" for i in range(args.genes)])
+    csv_path = os.path.join(workdir, "counts.csv")
+    counts.to_csv(csv_path, index=False)
+    with open(csv_path, "rb") as f:
+        payload = f.read()
+
+    start = time.perf_counter()
+    pd.read_csv(csv_path)
+    text_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_counts(FakeUpload(payload, "counts.csv", "cold"))
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm = load_counts(FakeUpload(payload, "counts.csv", "warm"))
+    warm_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_counts(FakeUpload(payload, "counts.csv", "warm"))
+    rerun_time = time.perf_counter() - start
+
+    assert (warm.to_numpy() == counts.iloc[:, 1:].to_numpy()).all()
+    print(f"{args.genes} genes x {args.samples} samples ({len(payload) / 1024 ** 2:.0f} MB)")
+    print(f"pd.read_csv          : {text_time:8.3f} s")
+    print(f"cold load (parse+npy): {cold_time:8.3f} s")
+    print(f"warm load (new hash) : {warm_time:8.3f} s")
+    print(f"warm load (rerun)    : {rerun_time:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Peak memory of the pandas preprocessing chain versus preprocess_counts.
+
+Run from the repository root:
+
+    $ python -m benchmarks.preprocess_memory_benchmark --genes 60000 --samples 500
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocess import preprocess_counts
+
+
+def pandas_chain(counts):
+    data = counts.fillna(0)
+    data = data.round().astype(np.int32)
+    data = data[data.sum(axis=1) > 0]
+    return data.T
+
+
+def measure(fn, counts):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(counts)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--genes", type=int, default=60000)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    # Counts mapped from disk, as load_counts hands them to the pages
+    rng = np.random.default_rng(0)
+    values = rng.negative_binomial(2, 0.02, size=(args.genes, args.samples)).astype(np.float64)
+    values[rng.random(args.genes) < 0.2] = 0
+    path = os.path.join(tempfile.mkdtemp(), "values.npy")
+    np.save(path, values)
+    del values
+    counts = pd.DataFrame(
+        np.load(path, mmap_mode="r"),
+        index=[f"ENSG{i:011d}" for i in range(args.genes)],
+        columns=[f"TCGA-{i:04d}-01A" for i in range(args.samples)],
+        copy=False,
+    )
+
+    expected, chain_peak, chain_time = measure(pandas_chain, counts)
+    actual, compact_peak, compact_time = measure(preprocess_counts, counts)
+
+    assert (actual.to_numpy() == expected.to_numpy()).all()
+    assert actual.index.equals(expected.index) and actual.columns.equals(expected.columns)
+    final = actual.to_numpy().nbytes
+    print(f"{args.genes} genes x {args.samples} samples, final matrix {final / 1024 ** 2:.0f} MB ({actual.dtypes.iloc[0]})")
+    print(f"pandas chain      : peak {chain_peak / 1024 ** 2:8.0f} MB ({chain_peak / final:4.1f}x final)  {chain_time:6.2f} s")
+    print(f"preprocess_counts : peak {compact_peak / 1024 ** 2:8.0f} MB ({compact_peak / final:4.1f}x final)  {compact_time:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
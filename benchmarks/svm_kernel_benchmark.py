@@ -0,0 +1,59 @@
+"""Compares GridSearchCV(SVC()) with the precomputed-kernel engine on the SVM page's grid.
+
+Run from the repository root:
+
+    $ python -m benchmarks.svm_kernel_benchmark --samples 300 --genes 5000
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from sklearn.model_selection import ParameterGrid
+from sklearn.svm import SVC
+
+from utils.search import grid_scores
+from utils.svm_kernels import svm_kernel_scores
+
+PARAM_GRID = {
+    'kernel': ['poly', 'rbf', 'linear'],
+    'C': [0.1, 1, 10],
+    'gamma': [0.01, 0.1, 1],
+    'coef0': [0, 1],
+    'class_weight': [None, 'balanced'],
+    'probability': [True]
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--genes", type=int, default=5000)
+    parser.add_argument("--jobs", type=int, default=1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    rng = np.random.default_rng(0)
+    y = (rng.random(args.samples) < 0.3).astype(int)
+    X = rng.poisson(20, size=(args.samples, args.genes)).astype(np.int16)
+    X[y == 1, :50] += 4
+    candidates = list(ParameterGrid(PARAM_GRID))
+
+    start = time.perf_counter()
+    expected = grid_scores(SVC(), candidates, X, y, 5, "accuracy", args.jobs)
+    grid_time = time.perf_counter() - start
+
+    timings = {}
+    for dtype in (np.float64, np.float32):
+        start = time.perf_counter()
+        actual = svm_kernel_scores(SVC(), candidates, X, y, 5, "accuracy", args.jobs, dtype=dtype)
+        timings[np.dtype(dtype).name] = (time.perf_counter() - start, np.nanmax(np.abs(actual - expected)))
+
+    print(f"{args.samples} samples x {args.genes} genes, {len(candidates)} settings x 5 folds")
+    print(f"GridSearchCV      : {grid_time:8.2f} s")
+    for name, (elapsed, diff) in timings.items():
+        print(f"kernel {name:<9}  : {elapsed:8.2f} s  ({grid_time / elapsed:.1f}x faster, max |diff| {diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,19 @@
 import streamlit as st
-import pandas as pd
 import os
-
-def seperateByRace(file, target, name, race):
-    """Separates Data by Race"""
-    racer = file[file["race.demographic"].str.contains(race, case=False, na=False)]
-    output_file_path = os.path.join(target, f"{name}.csv")
-    racer.to_csv(output_file_path, index=False)
-    return output_file_path
-
-def matchingDNA(race, counts, target, name):
-    """Matches Sample ID from phenotypes to counts"""
-    phenotypeData = pd.read_csv(race)
-    colA1 = phenotypeData.iloc[:, 0]
-    newFile = counts[['Ensembl_ID'] + [col for col in colA1 if col in counts.columns[1:]]]
-    output_file_path = os.path.join(target, f"{name}.csv")
-    newFile.to_csv(output_file_path, index=False)
-    return output_file_path
+from utils.segregation import partition_by_race, stream_partitions
+from utils.upload_store import get_upload_store, load_upload
+
+def segregateByRace(partitions, counts_path, prefix, selected_races):
+    """Writes the selected races' matched counts not yet on disk in one pass over the counts file"""
+    output_paths = {race: f"{prefix}.matched_{race}.csv" for race in selected_races}
+    missing = {
+        path: partitions.get(race, [])
+        for race, path in output_paths.items()
+        if not os.path.exists(path)
+    }
+    if missing:
+        stream_partitions(counts_path, missing)
+    return output_paths
 
 # Streamlit App Configuration
 st.set_page_config(
@@ -45,8 +42,13 @@ if phenotype_file and counts_file:
     st.markdown("### 🌍 Race Selection")
     st.info("Choose one or more racial demographics to process")
 
+    # Group the phenotype once by race; every category found in the file is selectable
+    phenotype_data = load_upload(phenotype_file)
+    race_partitions = partition_by_race(phenotype_data)
+
     # Improved Race Selection
     races = ['white', 'black or african american', 'not reported', 'asian', 'american indian or alaska native']
+    races += [race for race in race_partitions if race not in races]
     selected_races = st.multiselect(
         "Select Races to Separate", 
         races, 
@@ -55,37 +57,30 @@ if phenotype_file and counts_file:
 
     if selected_races:
         try:
-            # Existing processing logic remains the same
-            os.makedirs("temp", exist_ok=True)
-            phenotype_path = os.path.join("temp", phenotype_file.name)
-            counts_path = os.path.join("temp", counts_file.name)
-
-            with open(phenotype_path, "wb") as f:
-                f.write(phenotype_file.read())  
-            with open(counts_path, "wb") as f:
-                f.write(counts_file.read())
+            store = get_upload_store()
+            counts_digest, counts_path = store.put(counts_file)
 
-            phenotype_data = pd.read_csv(phenotype_path)
-            counts_data = pd.read_csv(counts_path)
+            # Outputs are named by the counts and phenotype content and sit next to the counts upload,
+            # so users never share a file unless its content is identical, and eviction removes them together
+            prefix = os.path.join(store.root, f"{counts_digest}.{store.digest(phenotype_file)[:16]}")
 
-            os.makedirs("temp", exist_ok=True)
+            # Counts are partitioned for all selected races in a single streamed pass
+            output_paths = segregateByRace(race_partitions, counts_path, prefix, selected_races)
 
             # Create a container to display processing results
             results_container = st.container()
 
             with results_container:
                 st.markdown("### 🔍 Processing Results")
-                for race in selected_races:
-                    # Existing race processing logic
-                    race_file_path = seperateByRace(phenotype_data, "temp", race, race)
-                    output_file_path = matchingDNA(race_file_path, counts_data, "temp", f"matched_{race}")
-                    
+                for race, output_file_path in output_paths.items():
                     # Improved result display
                     col1, col2 = st.columns([3, 1])
                     with col1:
                         st.success(f"Processed Race: {race}")
                     with col2:
-                        with open(output_file_path, "rb") as file:
+                        with store.lock:
+                            file = open(output_file_path, "rb")
+                        with file:
                             st.download_button(
                                 label="Download", 
                                 data=file, 
@@ -1,13 +1,45 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from pydeseq2.dds import DeseqDataSet
-from pydeseq2.ds import DeseqStats
+import plotly.graph_objects as go
+from utils.counts_cache import load_counts
+from utils.deg import (
+    fast_screen, fit_key, low_count_mask, race_condition_metadata, session_result,
+    submit_deseq2, submit_multi_race_deseq2
+)
+from utils.deg_filter import FILTERS, DegIndex, combined_mask, filter_columns
+from utils.jobs import get_job_runner
+from utils.plots import ma_plot, selected_genes, volcano_plot
+from utils.preprocess import preprocess_counts
+from utils.scheduler import COMPUTE_CPUS, CPUS_PER_JOB
+from utils.upload_store import load_upload
+
+CONTRAST = ("Condition", "cancer", "normal")
+DEG_METHODS = [
+    "DESeq2 (exact)",
+    "Fast screen (Welch t-test)",
+    "Fast screen (Wilcoxon rank-sum)",
+    "DESeq2 on filtered genes",
+]
+REFIT_METHOD = DEG_METHODS[-1]
+ANALYSIS_MODES = ["Single Cohort", "All Races in One Fit", "Batch of Matched Files"]
 
 def main():
     st.set_page_config(page_title="DEG Analysis", layout="wide")
     st.title("🧬 Differential Gene Expression Analysis")
 
+    analysis_mode = st.radio(
+        "Analysis Mode",
+        ANALYSIS_MODES,
+        horizontal=True,
+        help="One fit with race and condition in the design serves every race's cancer vs normal contrast"
+    )
+    if analysis_mode == "All Races in One Fit":
+        multi_race_section()
+        return
+    if analysis_mode == "Batch of Matched Files":
+        batch_section()
+        return
+
     # File Upload Section
     st.header("📂 Data Upload")
     racial_dataset = st.file_uploader(
@@ -29,28 +61,153 @@ def main():
             display_data_overview(data)
         
         with tab2:
-            deg_results = perform_deg_analysis(data)
-            st.write("DEG Statistics Results")
-            st.dataframe(deg_results)
+            prefiltered, n_dropped = prefilter_section(data)
+            deg_results, source = run_deg_method(prefiltered, n_dropped)
+            if deg_results is not None:
+                st.write("DEG Statistics Results")
+                st.dataframe(deg_results)
         
         with tab3:
-            deg_filtering_section(deg_results)
+            show_filtering_or_wait(deg_results, source)
+    
+    elif "deg_job" in st.query_params:
+        # The upload is gone after a browser refresh, but the job and its results are not
+        st.info("Showing the DEG job from your previous visit.")
+        deg_results = poll_deg_job(st.query_params["deg_job"])
+        if isinstance(deg_results, dict):
+            deg_results = select_race_results(deg_results)
+        if deg_results is not None:
+            st.dataframe(deg_results)
+            show_filtering_or_wait(deg_results)
 
-def load_and_preprocess_data(uploaded_file):
-    st.success("File Uploaded Successfully!")
+def multi_race_section():
+    st.header("📂 Data Upload")
+    col1, col2 = st.columns(2)
+    with col1:
+        counts_file = st.file_uploader(
+            "Upload Unsplit Counts Data",
+            type=["csv", "xlsx"],
+            help="Counts of all races, before Data Segregation"
+        )
+    with col2:
+        phenotype_file = st.file_uploader("Upload Phenotype Data", type=["csv"])
     
-    if uploaded_file.name.endswith(".csv"):
-        data = pd.read_csv(uploaded_file)
-    else:
-        data = pd.read_excel(uploaded_file, engine="openpyxl")
+    if not (counts_file and phenotype_file):
+        st.info("Upload the unsplit counts and the phenotype file to fit all races at once.")
+        return
+    
+    data = load_and_preprocess_data(counts_file)
+    metadata = race_condition_metadata(data, load_upload(phenotype_file))
+    data = data.loc[metadata.index]
+    
+    tab1, tab2, tab3 = st.tabs([
+        "📊 Data Overview", 
+        "🧮 DEG Analysis", 
+        "🔍 Filtered Results"
+    ])
+    
+    with tab1:
+        st.subheader("Samples per Race and Condition")
+        st.dataframe(pd.crosstab(metadata["Race"], metadata["Condition"]))
+    
+    with tab2:
+        prefiltered, n_dropped = prefilter_section(data)
+        runner = get_job_runner()
+        job_id = submit_multi_race_deseq2(runner, prefiltered, metadata)
+        st.query_params["deg_job"] = job_id
+        deg_results = poll_deg_job(
+            job_id,
+            restart=lambda: submit_multi_race_deseq2(runner, prefiltered, metadata, restart=True),
+            n_genes=prefiltered.shape[1],
+            n_dropped=n_dropped
+        )
+        if deg_results is not None:
+            deg_results = select_race_results(deg_results)
+        if deg_results is not None:
+            st.write("DEG Statistics Results")
+            st.dataframe(deg_results)
+    
+    with tab3:
+        show_filtering_or_wait(deg_results, "All Races in One Fit")
+
+def batch_section():
+    st.header("📂 Data Upload")
+    matched_files = st.file_uploader(
+        "Upload Matched Counts Files",
+        type=["csv", "xlsx"],
+        accept_multiple_files=True,
+        help="The matched_<race>.csv outputs of Data Segregation, fitted independently and concurrently"
+    )
+    if not matched_files:
+        st.info("Upload one or more matched counts files to fit them in parallel.")
+        return
+    
+    cpus_per_fit = st.number_input(
+        "CPUs per Fit",
+        min_value=1,
+        max_value=COMPUTE_CPUS,
+        value=CPUS_PER_JOB,
+        help="Fits run side by side while their CPU shares fit the server budget; the rest wait in the queue"
+    )
     
-    data = data.set_index("Ensembl_ID")
-    data = data.fillna(0)
-    data = data.round().astype(np.int32)
-    data = data[data.sum(axis=1) > 0]
-    data = data.T
+    runner = get_job_runner()
+    jobs, restarts = {}, {}
+    for matched_file in matched_files:
+        data = preprocess_counts(load_counts(matched_file))
+        metadata = create_metadata(data)
+        jobs[matched_file.name] = submit_deseq2(
+            runner, data, metadata, "Condition", CONTRAST, cpus=cpus_per_fit
+        )
+        restarts[matched_file.name] = lambda data=data, metadata=metadata: submit_deseq2(
+            runner, data, metadata, "Condition", CONTRAST, restart=True, cpus=cpus_per_fit
+        )
+    
+    batch_progress(jobs, restarts)
+
+@st.fragment(run_every=2)
+def batch_progress(jobs, restarts):
+    runner = get_job_runner()
+    states = {name: runner.status(job_id) for name, job_id in jobs.items()}
+    n_done = sum(status is not None and status["state"] == "done" for status in states.values())
+    st.progress(n_done / len(jobs), text=f"{n_done} of {len(jobs)} fits finished")
+    
+    # Finished tables are shown as soon as their fit completes
+    for name, job_id in jobs.items():
+        status = states[name]
+        state = status["state"] if status else "unavailable"
+        with st.expander(f"{name}: {state}", expanded=state == "done"):
+            if state == "done":
+                deg_results = session_result(job_id, runner.result)
+                st.dataframe(deg_results)
+                st.download_button(
+                    label="Download",
+                    data=deg_results.to_csv(),
+                    file_name=f"DEG_{name.rsplit('.', 1)[0]}.csv",
+                    mime="text/csv",
+                    key=f"download_{job_id}"
+                )
+            elif state in ("queued", "running"):
+                st.progress(status["progress"], text=status["stage"])
+                if st.button("Cancel", key=f"cancel_{job_id}"):
+                    runner.cancel(job_id)
+            else:
+                if state == "failed":
+                    st.error(status["error"])
+                if st.button("Run Again", key=f"restart_{job_id}"):
+                    restarts[name]()
+
+def select_race_results(results_by_race):
+    if not results_by_race:
+        st.warning("No race has both cancer and normal samples, so there is no contrast to test.")
+        return None
+    race = st.selectbox("Race Contrast (cancer vs normal)", list(results_by_race))
+    return results_by_race[race]
+
+def load_and_preprocess_data(uploaded_file):
+    st.success("File Uploaded Successfully!")
     
-    return data
+    # Rounds, drops all-zero genes and transposes in one pass without intermediate copies
+    return preprocess_counts(load_counts(uploaded_file))
 
 def display_data_overview(data):
     st.subheader("Preprocessed Counts Data")
@@ -65,55 +222,248 @@ def create_metadata(counts_data):
     metadata = pd.DataFrame({'Ensembl_ID': counts_data.index, 'Condition': conditions})
     return metadata.set_index('Ensembl_ID')
 
-def perform_deg_analysis(data):
+def prefilter_section(data):
     metadata = create_metadata(data)
+    smallest_group = int(metadata["Condition"].value_counts().min())
     
-    dds = DeseqDataSet(
-        counts=data,
-        metadata=metadata,
+    with st.expander("🧹 Low-Count Gene Prefilter", expanded=True):
+        # Off by default so DESeq2 sees every gene, as it did before the prefilter existed
+        if not st.checkbox("Drop Low-Count Genes", value=False):
+            st.caption(f"All {data.shape[1]:,} genes are passed to the DEG analysis.")
+            return data, 0
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_count = st.number_input("Min Count", value=10, min_value=0)
+        with col2:
+            min_samples = st.number_input("In at Least N Samples", value=smallest_group, min_value=1, max_value=len(data))
+        with col3:
+            min_cpm = st.number_input("Min CPM", value=0.0, min_value=0.0, step=0.5)
+        
+        keep = low_count_mask(data, min_count, min_samples, min_cpm)
+        n_dropped = int((~keep).sum())
+        st.metric(
+            "Genes Passed to DEG Analysis",
+            f"{len(keep) - n_dropped:,} / {len(keep):,}",
+            delta=f"-{n_dropped:,} low-count genes",
+            delta_color="off"
+        )
+    
+    if n_dropped == 0:
+        return data, 0
+    return data.loc[:, keep], n_dropped
+
+def run_deg_method(data, n_dropped=0):
+    method = st.radio(
+        "DEG Method",
+        DEG_METHODS,
+        horizontal=True,
+        help="Fast screens return the same columns in seconds; filter them, then refit DESeq2 on the survivors"
+    )
+    
+    if method.startswith("Fast screen"):
+        return perform_fast_screen(data, "wilcoxon" if "Wilcoxon" in method else "welch"), method
+    
+    if method == REFIT_METHOD:
+        # Refit results are never offered as a new snapshot, so the gene set cannot shrink on its own
+        snapshot = st.session_state.get("deg_filtered_genes")
+        filtered_genes = [gene for gene in snapshot["genes"] if gene in data.columns] if snapshot else []
+        if not filtered_genes:
+            st.info("Filter a fast screen or DESeq2 result in the Filtered Results tab, then press \"Use These Genes for DESeq2\".")
+            return None, None
+        st.write(f"Fitting DESeq2 on {len(filtered_genes)} genes kept from the {snapshot['source']} results")
+        return perform_deg_analysis(data[filtered_genes], n_dropped), None
+    
+    return perform_deg_analysis(data, n_dropped), method
+
+def perform_fast_screen(data, test):
+    metadata = create_metadata(data)
+    key = fit_key(data, metadata, ("fast screen", test), CONTRAST)
+    return session_result(key, lambda _: fast_screen(data, metadata, CONTRAST, test))
+
+def perform_deg_analysis(data, n_dropped=0):
+    metadata = create_metadata(data)
+    
+    # The fit runs as a background job keyed by counts content, design and contrast,
+    # so reruns, filtering and page reloads pick up the same job instead of refitting
+    job_id = submit_deseq2(
+        get_job_runner(),
+        data,
+        metadata,
         design_factors="Condition",
-        n_cpus=-1
+        contrast=CONTRAST
+    )
+    st.query_params["deg_job"] = job_id
+    return poll_deg_job(
+        job_id,
+        restart=lambda: submit_deseq2(get_job_runner(), data, metadata, "Condition", CONTRAST, restart=True),
+        n_genes=data.shape[1],
+        n_dropped=n_dropped
     )
-    dds.deseq2()
+
+def poll_deg_job(job_id, restart=None, n_genes=None, n_dropped=0):
+    runner = get_job_runner()
+    status = runner.status(job_id)
     
-    stat_res = DeseqStats(dds, contrast=("Condition", "cancer", "normal"))
-    stat_res.summary()
+    if status is None:
+        st.warning("This DEG job is no longer available. Please upload the counts data again.")
+        return None
+    if status["state"] == "done":
+        if status.get("elapsed") and n_genes:
+            report_fit_time(status["elapsed"], n_genes, n_dropped)
+        return session_result(job_id, runner.result)
     
-    return stat_res.results_df
+    deg_job_progress(job_id, restart)
+    return None
+
+def report_fit_time(elapsed, n_genes, n_dropped):
+    message = f"DESeq2 fit took {elapsed:.1f} s on {n_genes:,} genes."
+    if n_dropped:
+        # Dispersion and GLM fits scale linearly with the number of genes
+        saved = elapsed * n_dropped / n_genes
+        message += f" The prefilter removed {n_dropped:,} low-count genes, saving an estimated {saved:.1f} s."
+    st.caption(message)
 
-def deg_filtering_section(deg_results):
+@st.fragment(run_every=2)
+def deg_job_progress(job_id, restart):
+    runner = get_job_runner()
+    status = runner.status(job_id)
+    
+    if status is None:
+        # Pruned from the job history (or never known to this server) since the last poll
+        st.warning("This DEG job has expired. Please run the DEG analysis again.")
+        if restart is not None and st.button("Run DEG Analysis Again", key="restart_deg"):
+            restart()
+            st.rerun()
+    elif status["state"] == "done":
+        st.rerun()
+    elif status["state"] in ("queued", "running"):
+        st.progress(status["progress"], text=f"DESeq2 job `{job_id[:8]}`: {status['stage']}")
+        if st.button("Cancel DEG Analysis", key="cancel_deg"):
+            runner.cancel(job_id)
+    else:
+        if status["state"] == "failed":
+            st.error(f"DEG analysis failed: {status['error']}")
+        else:
+            st.warning(f"DEG analysis {status['state']}.")
+        if restart is not None and st.button("Run DEG Analysis Again", key="restart_deg"):
+            restart()
+            st.rerun()
+
+def show_filtering_or_wait(deg_results, source=None):
+    if deg_results is None:
+        st.info("Filtering becomes available once the DEG analysis has finished.")
+    else:
+        deg_filtering_section(deg_results, source)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_deg_index(deg_results):
+    return DegIndex(deg_results)
+
+@st.fragment
+def deg_filtering_section(deg_results, source=None):
+    # Sorted columns make every count below a binary search, so filters update live
+    deg_index = build_deg_index(deg_results)
     st.subheader("DEG Filtering Options")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         cutoff_padj = st.number_input("Padj Cutoff", value=0.05, min_value=0.0, max_value=1.0, step=0.01)
+        show_kept(deg_index, "padj", cutoff_padj)
         cutoff_log2FoldChange = st.number_input("Log2 Fold Change", value=0.0, step=0.5)
+        show_kept(deg_index, "log2FoldChange", cutoff_log2FoldChange)
     
     with col2:
         cutoff_baseMean = st.number_input("Base Mean", value=10, min_value=0)
+        show_kept(deg_index, "baseMean", cutoff_baseMean)
         cutoff_pvalue = st.number_input("P-value", value=0.0, min_value=0.0, max_value=1.0, step=0.01)
+        show_kept(deg_index, "pvalue", cutoff_pvalue)
     
     with col3:
         cutoff_lfcSE = st.number_input("LFC Standard Error", value=0.0, step=0.1)
+        show_kept(deg_index, "lfcSE", cutoff_lfcSE)
         cutoff_stat = st.number_input("Stat", value=0.0, step=0.1)
+        show_kept(deg_index, "stat", cutoff_stat)
     
-    if st.button("Apply Filters"):
-        filtered_results = filter_deg_results(
-            deg_results, 
-            cutoff_padj, 
-            cutoff_log2FoldChange, 
-            cutoff_baseMean, 
-            cutoff_pvalue, 
-            cutoff_lfcSE, 
-            cutoff_stat
-        )
-        
-        st.subheader("Filtered Results")
-        st.dataframe(filtered_results)
-        
-        st.subheader("DEG Genes")
-        st.write(filtered_results.index.to_list())
+    cutoffs = {
+        "padj": cutoff_padj,
+        "log2FoldChange": cutoff_log2FoldChange,
+        "baseMean": cutoff_baseMean,
+        "pvalue": cutoff_pvalue,
+        "lfcSE": cutoff_lfcSE,
+        "stat": cutoff_stat,
+    }
+    passing = deg_index.mask(cutoffs)
+    filtered_results = deg_results[passing]
+    
+    st.metric("Genes Passing All Filters", f"{len(filtered_results):,} / {len(deg_index):,}")
+    with st.expander("📊 Genes Kept per Cutoff"):
+        kept_curves(deg_index, cutoffs)
+    
+    # A lasso or box selection on either plot narrows the filtered list to the selected genes
+    selection = deg_plots(deg_results, passing)
+    if selection:
+        filtered_results = filtered_results[filtered_results.index.isin(selection)]
+        st.info(f"Plot selection keeps {len(filtered_results):,} of the filtered genes")
+    if source is not None:
+        snapshot_section(deg_index.digest, source, filtered_results.index.to_list(), bool(selection))
+    
+    st.subheader("Filtered Results")
+    st.dataframe(filtered_results)
+    
+    st.subheader("DEG Genes")
+    st.write(filtered_results.index.to_list())
+
+def snapshot_section(digest, source, genes, from_selection=False):
+    # The refit method only ever reads this snapshot; it changes on an explicit click, never on a rerun
+    snapshot = st.session_state.get("deg_filtered_genes")
+    if snapshot and snapshot["digest"] == digest:
+        st.caption(f"{len(snapshot['genes']):,} genes from these results are set for \"{REFIT_METHOD}\".")
+    # A plot selection only reaches the refit through this button, and the label says it is included
+    label = "Use the Selected Genes for DESeq2" if from_selection else "Use These Genes for DESeq2"
+    if st.button(label, disabled=not genes, help=f"Refit with \"{REFIT_METHOD}\" in the DEG Analysis tab"):
+        if from_selection:
+            source = f"{source} (plot selection)"
+        st.session_state["deg_filtered_genes"] = {"digest": digest, "source": source, "genes": genes}
+        st.success(f"{len(genes):,} genes set for \"{REFIT_METHOD}\".")
+
+def deg_plots(deg_results, passing):
+    # WebGL scatters: filtered genes drawn exactly, the rest binned to one point per grid cell
+    st.subheader("Volcano and MA Plots")
+    selection = []
+    for column, (title, plot) in zip(st.columns(2), (("Volcano", volcano_plot), ("MA", ma_plot))):
+        with column:
+            fig, trace_genes = plot(deg_results, passing)
+            fig.update_layout(title=title)
+            event = st.plotly_chart(
+                fig,
+                use_container_width=True,
+                key=f"deg_{title.lower()}_plot",
+                on_select="rerun",
+                selection_mode=("lasso", "box"),
+            )
+            selection.extend(selected_genes(event, trace_genes))
+    return selection
+
+def show_kept(deg_index, name, cutoff):
+    st.caption(f"Keeps {int(deg_index.count_passing(name, cutoff)):,} genes on its own")
+
+def kept_curves(deg_index, cutoffs):
+    tabs = st.tabs(list(cutoffs))
+    for tab, (name, cutoff) in zip(tabs, cutoffs.items()):
+        with tab:
+            grid, kept = deg_index.kept_curve(name)
+            fig = go.Figure(go.Scatter(x=grid, y=kept, mode="lines", line_shape="hv"))
+            fig.add_vline(x=cutoff, line_dash="dash", annotation_text=f"cutoff {cutoff:g}")
+            fig.update_layout(
+                xaxis_title=f"|{name}| cutoff" if FILTERS[name][1] else f"{name} cutoff",
+                yaxis_title="Genes kept",
+                height=300,
+                margin=dict(l=10, r=10, t=30, b=10)
+            )
+            if name in ("padj", "pvalue", "baseMean") and grid.size and grid.min() >= 0:
+                fig.update_xaxes(type="log")
+            st.plotly_chart(fig, use_container_width=True, key=f"kept_curve_{name}")
 
 def filter_deg_results(
     deg_results, 
@@ -124,16 +474,16 @@ def filter_deg_results(
     cutoff_lfcSE, 
     cutoff_stat
 ):
-    filtered_results = deg_results.copy()
-    
-    filtered_results = filtered_results[filtered_results['padj'] < cutoff_padj]
-    filtered_results = filtered_results[filtered_results['log2FoldChange'].abs() > cutoff_log2FoldChange]
-    filtered_results = filtered_results[filtered_results['baseMean'] > cutoff_baseMean]
-    filtered_results = filtered_results[filtered_results['pvalue'] < cutoff_pvalue]
-    filtered_results = filtered_results[filtered_results['lfcSE'] > cutoff_lfcSE]
-    filtered_results = filtered_results[filtered_results['stat'].abs() > cutoff_stat]
-    
-    return filtered_results
+    # One combined mask over the numpy columns, no intermediate frames
+    cutoffs = {
+        "padj": cutoff_padj,
+        "log2FoldChange": cutoff_log2FoldChange,
+        "baseMean": cutoff_baseMean,
+        "pvalue": cutoff_pvalue,
+        "lfcSE": cutoff_lfcSE,
+        "stat": cutoff_stat,
+    }
+    return deg_results[combined_mask(filter_columns(deg_results), cutoffs)]
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,63 @@
+import io
+import os
+import time
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from sklearn.preprocessing import label_binarize
-from sklearn.metrics import roc_curve, auc
+from utils.roc import (
+    AucState, auc_significance, convex_hull, cutoff_table, gene_auc, gene_roc_curves, top_genes
+)
+from utils.counts_cache import load_counts
+from utils.plots import roc_figure
+from utils.preprocess import preprocess_counts
+from utils.scheduler import compute_slot
+from utils.upload_store import get_upload_store
+
+CURVE_DETAIL = ["Convex hull", "Key thresholds"]
+
+@st.cache_data(max_entries=32)
+def cached_roc_figure(digest, auc_threshold, top_k, search, detail, _X, _y_bin, _gene_ids, _roc_auc):
+    """ROC figure of the top-K genes over the threshold, keyed by upload digest and view settings"""
+    columns = top_genes(_roc_auc, auc_threshold, top_k, _gene_ids, search)
+    curves = gene_roc_curves(_X, _y_bin, columns, drop_intermediate=True)
+    if detail == "Convex hull":
+        curves = {i: convex_hull(*curve) for i, curve in curves.items()}
+    return roc_figure(
+        [curves[i] for i in columns],
+        [f"Gene {_gene_ids[i]} (AUC = {_roc_auc[i]:.4f})" for i in columns],
+        f"Top {len(columns)} Genes with AUC > {auc_threshold}",
+    )
+
+@st.cache_data(max_entries=8)
+def cached_cutoff_table(digest, _X, _y_bin):
+    """Youden cutoffs and sensitivities at fixed specificity, computed once per upload"""
+    return cutoff_table(_X, _y_bin)
+
+def auc_state_path(digest, appended=()):
+    """AUC state files sit next to the upload so the store evicts them together"""
+    suffix = "".join(f".{d[:16]}" for d in appended)
+    return os.path.join(get_upload_store().root, f"{digest}.auc{suffix}.npz")
+
+def append_samples(state, digest, new_files, gene_ids, positive_class):
+    """Applies each new-samples file in order, reusing states persisted by earlier runs"""
+    store = get_upload_store()
+    appended = []
+    for new_file in new_files:
+        appended.append(store.digest(new_file))
+        path = auc_state_path(digest, appended)
+        if os.path.exists(path):
+            state = AucState.load(path)
+            continue
+        new_counts = load_counts(new_file)
+        missing = pd.Index(gene_ids).difference(new_counts.index)
+        if len(missing):
+            raise ValueError(f"{new_file.name} lacks {len(missing):,} genes of the dataset, e.g. {missing[0]}")
+        new_features = preprocess_counts(new_counts.loc[gene_ids], drop_empty=False)
+        new_labels = np.array(['cancer' if '-01' in sample else 'normal' for sample in new_features.index])
+        state = state.appended(np.asarray(new_features), new_labels == positive_class)
+        state.save(path)
+    return state
 
 # Page Configuration
 st.set_page_config(layout="wide", page_title="Gene ROC Analysis")
@@ -27,15 +81,16 @@ auc_threshold = st.slider("AUC Threshold", min_value=0.5, max_value=1.0, value=0
 
 if upregulated_file and combined_dataset_file:
     # Tabs for different views
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Sample Info", "📈 ROC Curves", "🧬 High AUC Genes", "💾 Export"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["📊 Sample Info", "📈 ROC Curves", "🧬 High AUC Genes", "💾 Export", "➕ Append Samples"]
+    )
 
     with tab1:
         # Load and process data
-        data = pd.read_csv(upregulated_file)
-        geneID = data.iloc[:,0]
-        features_df = data.iloc[:,1:]
-        data = data.set_index("Ensembl_ID")
-        data = data.T
+        data = load_counts(upregulated_file)
+        geneID = pd.Series(data.index)
+        features_df = preprocess_counts(data, drop_empty=False)
+        data = pd.DataFrame(index=features_df.index)
         data['label'] = ['cancer' if '-01' in sample else 'normal' for sample in data.index]
         
         # Sample count information
@@ -52,47 +107,68 @@ if upregulated_file and combined_dataset_file:
 
     with tab2:
         # Prepare data for ROC
-        X = np.asarray(features_df.round().astype(int).T)
+        X = np.asarray(features_df)
         y = np.asarray(data['label'])
         
         y_bin = label_binarize(y, classes=np.unique(y))
         
-        fpr = dict()
-        tpr = dict()
-        roc_auc = dict()
-
-        for i in range(X.shape[1]):
-            fpr[i], tpr[i], _ = roc_curve(y_bin.ravel(), X[:, i].ravel())
-            roc_auc[i] = auc(fpr[i], tpr[i])
+        # AUC of every gene in one ranked pass, curves only for the genes drawn
+        roc_auc = gene_auc(X, y_bin)
+        high_auc_idx = np.flatnonzero(roc_auc > auc_threshold)
+        high_auc_genes = geneID[high_auc_idx].to_list()
+        
+        # Plot controls
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            top_k = st.slider("Curves to Draw (top by AUC)", min_value=1, max_value=200, value=25)
+        with col_b:
+            search = st.text_input("Search Gene ID", placeholder="e.g. ENSG00000141510").strip()
+        with col_c:
+            detail = st.radio(
+                "Curve Detail",
+                CURVE_DETAIL,
+                horizontal=True,
+                help="Each curve is reduced to its convex hull or to the thresholds where it turns"
+            )
         
         # Plot ROC Curve
-        plt.figure(figsize=(12, 8))
-        
-        high_auc_genes = []
-        for i in range(len(geneID)):
-            if roc_auc[i] > auc_threshold:
-                plt.plot(fpr[i], tpr[i], lw=2, label=f'Gene {geneID[i]} (AUC = {roc_auc[i]:.4f})')
-                high_auc_genes.append(geneID[i])
-        
-        plt.plot([0, 1], [0, 1], 'k--', lw=2)
-        plt.xlim([0.0, 1.0])
-        plt.ylim([0.0, 1.05])
-        plt.xlabel('False Positive Rate')
-        plt.ylabel('True Positive Rate')
-        plt.title(f'ROC Curve for Genes with AUC > {auc_threshold}')
-        plt.legend(loc="lower right", bbox_to_anchor=(1.05, 0))
-        plt.tight_layout()
-        st.pyplot(plt)
+        fig = cached_roc_figure(
+            get_upload_store().digest(upregulated_file), auc_threshold, top_k, search, detail,
+            X, y_bin, geneID.to_numpy(), roc_auc
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(high_auc_genes):,} genes have AUC > {auc_threshold}; the best {len(fig.data) - 1} matching the search are drawn")
 
     with tab3:
         # Display high AUC genes
         st.header("High AUC Genes")
         
         # ROC DataFrame
+        # Youden-optimal cutoff and sensitivity at fixed specificity, one sort per gene
         roc_df = pd.DataFrame({
             'Ensembl_ID': geneID,
-            'ROC_AUC': [roc_auc[i] for i in range(len(geneID))]
+            'ROC_AUC': roc_auc,
+            **cached_cutoff_table(get_upload_store().digest(upregulated_file), X, y_bin)
         })
+        st.caption(f"Cutoffs call a sample '{np.unique(y)[-1]}' when its expression is at or above the cutoff")
+        
+        # Bootstrap CIs and permutation p-values, kept per session for this upload and settings
+        with st.expander("🎲 AUC Confidence Intervals and Permutation P-values"):
+            col_a, col_b = st.columns(2)
+            with col_a:
+                n_boot = st.number_input("Bootstrap Replicates", min_value=100, max_value=10000, value=1000, step=100)
+            with col_b:
+                n_perm = st.number_input("Label Permutations", min_value=100, max_value=10000, value=1000, step=100)
+            significance = st.session_state.setdefault("auc_significance", {})
+            significance_key = (get_upload_store().digest(upregulated_file), n_boot, n_perm)
+            if significance_key not in significance and st.button("Compute CIs and P-values"):
+                with compute_slot("AUC resampling") as n_jobs:
+                    with st.spinner(f"Resampling {X.shape[1]:,} genes on {n_jobs} cores..."):
+                        significance[significance_key] = auc_significance(X, y_bin, n_boot, n_perm, n_jobs=n_jobs)
+            if significance_key in significance:
+                for column, values in significance[significance_key].items():
+                    roc_df[column] = values
+                st.caption("95% stratified bootstrap CI; one-sided permutation p-value, BH-adjusted in perm_padj")
         
         # Filter and sort high AUC genes
         high_auc_df = roc_df[roc_df['ROC_AUC'] > auc_threshold].sort_values('ROC_AUC', ascending=False)
@@ -105,8 +181,8 @@ if upregulated_file and combined_dataset_file:
         st.header("Filtered Dataset Export")
         
         # Read combined dataset and filter
-        combined_dataset = pd.read_csv(combined_dataset_file)
-        regulated_genes = combined_dataset[combined_dataset['Ensembl_ID'].isin(high_auc_genes)]
+        combined_dataset = load_counts(combined_dataset_file)
+        regulated_genes = combined_dataset[combined_dataset.index.isin(high_auc_genes)].reset_index()
         
         # Display and download options
         st.dataframe(regulated_genes, use_container_width=True)
@@ -123,14 +199,63 @@ if upregulated_file and combined_dataset_file:
             )
         
         with col_b:
+            excel_buffer = io.BytesIO()
+            regulated_genes.to_excel(excel_buffer, index=False)
             st.download_button(
                 label="📄 Download Excel",
-                data=regulated_genes.to_excel(index=False),
+                data=excel_buffer.getvalue(),
                 file_name="ROC_Results.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
 
+    with tab5:
+        # Incremental AUC update from the persisted per-gene sorted class values
+        st.header("Append New Samples")
+        new_files = st.file_uploader(
+            "📥 Upload New Samples (same genes, applied in order)",
+            type=['csv', 'xlsx'],
+            accept_multiple_files=True
+        )
+        
+        if new_files:
+            digest = get_upload_store().digest(upregulated_file)
+            base_path = auc_state_path(digest)
+            if os.path.exists(base_path):
+                state = AucState.load(base_path)
+            else:
+                state = AucState.from_matrix(X, y_bin, geneID)
+                state.save(base_path)
+            
+            start = time.perf_counter()
+            try:
+                state = append_samples(state, digest, new_files, geneID, np.unique(y)[-1])
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not append samples: {e}")
+                st.stop()
+            elapsed = time.perf_counter() - start
+            
+            new_auc = state.auc()
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Samples", f"{state.n_pos + state.n_neg:,}", f"+{state.n_pos + state.n_neg - len(y):,}")
+            with col_b:
+                st.metric("Genes with AUC > Threshold", f"{int((new_auc > auc_threshold).sum()):,}",
+                          f"{int((new_auc > auc_threshold).sum()) - len(high_auc_genes):+,}")
+            with col_c:
+                st.metric("Update Time", f"{elapsed:.2f} s")
+            
+            # Genes whose AUC crossed the threshold in either direction
+            crossed = (roc_auc > auc_threshold) != (new_auc > auc_threshold)
+            crossed_df = pd.DataFrame({
+                'Ensembl_ID': geneID[crossed],
+                'Previous_AUC': roc_auc[crossed],
+                'Updated_AUC': new_auc[crossed],
+                'Change': np.where(new_auc[crossed] > auc_threshold, 'Now above threshold', 'Now below threshold')
+            })
+            st.subheader(f"Genes Crossing AUC {auc_threshold}")
+            st.dataframe(crossed_df.sort_values('Updated_AUC', ascending=False), use_container_width=True)
+
 else:
     # Guidance for user
     st.info("""
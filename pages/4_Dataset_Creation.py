@@ -1,5 +1,11 @@
+import io
 import streamlit as st
 import pandas as pd
+import numpy as np
+from utils.counts_cache import load_counts
+from utils.redundancy import prune_redundant
+from utils.roc import gene_auc
+from utils.upload_store import load_upload
 
 # Page Configuration
 st.set_page_config(layout="wide", page_title="Dataset Creation Tool")
@@ -28,8 +34,8 @@ with col2:
 # Process files if both are uploaded
 if deg_file and dataset_file:
     # Read Files
-    ensembl_id = pd.read_csv(deg_file)
-    dataset = pd.read_csv(dataset_file)
+    ensembl_id = load_upload(deg_file)
+    dataset = load_counts(dataset_file)
 
     # Tabs for different views
     tab1, tab2, tab3 = st.tabs(["📋 Ensembl IDs", "🔍 Filtered Dataset", "📥 Export"])
@@ -48,8 +54,40 @@ if deg_file and dataset_file:
     with tab2:
         # Filter Dataset
         st.header("Created Counts Dataset")
-        regulated_genes = dataset[dataset['Ensembl_ID'].isin(ensembl_ids)]
-        regulated_genes = regulated_genes.set_index('Ensembl_ID')
+        regulated_genes = dataset[dataset.index.isin(ensembl_ids)]
+        
+        # Optional redundancy pruning: one best-AUC representative per co-expressed cluster
+        col_a, col_b = st.columns(2)
+        with col_a:
+            prune = st.checkbox(
+                "Prune Co-expressed Genes",
+                help="Keeps genes in decreasing AUC unless they correlate (log1p Pearson) with a gene already kept"
+            )
+        with col_b:
+            max_corr = st.slider("Max |Correlation| Between Kept Genes", min_value=0.5, max_value=0.99, value=0.8, step=0.01)
+        
+        if prune and len(regulated_genes):
+            X = np.asarray(regulated_genes, dtype=np.float64).T
+            if 'ROC_AUC' in ensembl_id.columns:
+                auc = ensembl_id.set_index('Ensembl_ID')['ROC_AUC'].reindex(regulated_genes.index).to_numpy()
+            else:
+                labels = np.array(['-01' in sample for sample in regulated_genes.columns])
+                auc = gene_auc(X, labels)
+            # Down-regulated genes are as informative as up-regulated ones
+            relevance = np.maximum(auc, 1 - auc)
+            kept, representative = prune_redundant(X, relevance, max_corr)
+            
+            clusters = pd.DataFrame({
+                'Ensembl_ID': regulated_genes.index,
+                'Representative': regulated_genes.index[representative],
+                'AUC': auc
+            })
+            regulated_genes = regulated_genes.iloc[np.sort(kept)]
+            st.metric("Genes Kept After Pruning", f"{len(regulated_genes):,}", f"-{len(clusters) - len(regulated_genes):,}")
+            with st.expander("🔗 Clusters"):
+                cluster_sizes = clusters.groupby('Representative').size().rename('Genes').sort_values(ascending=False)
+                st.dataframe(cluster_sizes, use_container_width=True)
+                st.dataframe(clusters, use_container_width=True)
 
         # Display filtered genes with improved formatting
         st.dataframe(regulated_genes, use_container_width=True)
@@ -74,9 +112,11 @@ if deg_file and dataset_file:
             )
         
         with col_b:
+            excel_buffer = io.BytesIO()
+            regulated_genes.to_excel(excel_buffer, index=True)
             st.download_button(
                 label="📄 Download as Excel",
-                data=regulated_genes.to_excel(index=True),
+                data=excel_buffer.getvalue(),
                 file_name='Filtered_Dataset.xlsx',
                 mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 use_container_width=True
@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+from functools import partial
 from sklearn.naive_bayes import GaussianNB
-from sklearn.model_selection import train_test_split, GridSearchCV
-from imblearn.over_sampling import RandomOverSampler, BorderlineSMOTE, ADASYN, SMOTEN, KMeansSMOTE
-from imblearn.combine import SMOTEENN, SMOTETomek
-from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+from utils.counts_cache import load_counts, with_index_column
+from utils.preprocess import preprocess_counts
+from utils.naive_bayes import gaussian_nb_scores
+from utils.modelling import (
+    RESULT_COLUMNS, compare_methods, evaluate_method, search_controls, search_progress, show_search_outcome
+)
 
 # App Title
 st.title("Naive Bayes with Balancing and Hyperparameters")
@@ -16,22 +19,14 @@ uploaded_file = st.file_uploader("Upload your dataset (.csv or .xlsx)", type=["c
 
 if uploaded_file:
     # Load dataset
-    if uploaded_file.name.endswith(".csv"):
-        data = pd.read_csv(uploaded_file)
-    elif uploaded_file.name.endswith(".xlsx"):
-        data = pd.read_excel(uploaded_file)
+    data = load_counts(uploaded_file)
 
     st.write("Uploaded Dataset", data)
 
-    features_df = data.iloc[:, 1:]
-    features_df = features_df.round().astype(int).T
-    X = np.asarray(features_df)
-
-    # Select index column
-    index_col = st.selectbox("Select Index Column", options=data.columns)
-    data = data.set_index(index_col)
-    data = data.round().astype(int)
-    data = data.T
+    # Select index column; the upload's first column (gene IDs) is the cached index
+    index_col = st.selectbox("Select Index Column", options=[data.index.name, *data.columns])
+    data = preprocess_counts(with_index_column(data, index_col), drop_empty=False)
+    X = np.asarray(data)
 
     # Generate label column
     data['label'] = ['cancer' if '-01' in sample else 'normal' for sample in data.index]
@@ -76,86 +71,47 @@ if uploaded_file:
 
     # Hyperparameter tuning
     use_hyperparameter_tuning = st.radio("Use Hyperparameter Tuning?", options=['Yes', 'No'], index=1)
+    search_settings = search_controls() if use_hyperparameter_tuning == "Yes" else {}
+    if use_hyperparameter_tuning == "Yes":
+        # Class means and variances are computed once per fold and shared by every var_smoothing
+        search_settings["score_candidates"] = gaussian_nb_scores
     param_grid = {
         'var_smoothing': np.logspace(0, -9, num=100)
     }
 
-    results_df = pd.DataFrame(columns=[
-        'Balancing Method', 'Train Accuracy', 'Test Accuracy', 'Test F1 Score', 
-        'Test Precision', 'Test Recall', 'Train Classification Report', 'Test Classification Report'
-    ])
-
-    # Process each balancing method
-    for method_name in selected_balancing_methods:
-        st.write(f"Processing with {method_name}...")
-
-        # Dynamically create balancing method instances
-        if method_name == 'RandomOverSampler':
-            balancing_method = RandomOverSampler(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'SMOTEENN':
-            balancing_method = SMOTEENN(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'SMOTETomek':
-            balancing_method = SMOTETomek(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'ADASYN':
-            balancing_method = ADASYN(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'BorderlineSMOTE':
-            balancing_method = BorderlineSMOTE(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'KMeansSMOTE':
-            balancing_method = KMeansSMOTE(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == 'SMOTEN':
-            balancing_method = SMOTEN(random_state=random_state, sampling_strategy=sampling_strategy)
-        elif method_name == "No Balancing":
-            balancing_method = "No Balancing"
-
-        if balancing_method == "No Balancing":
-            X_train_resampled, y_train_resampled = X_train, y_train
-        else:
-            X_train_resampled, y_train_resampled = balancing_method.fit_resample(X_train, y_train)
-
-        # Encode labels
-        label_encoder = LabelEncoder()
-        y_train_encoded = label_encoder.fit_transform(y_train_resampled)
-        y_test_encoded = label_encoder.transform(y_test)
-
-        # Train model
-        if use_hyperparameter_tuning == "Yes":
-            st.write("Performing Hyperparameter Tuning...")
-            grid_search = GridSearchCV(GaussianNB(), param_grid, cv=5, scoring='accuracy', n_jobs=-1, verbose=0, return_train_score=True)
-            grid_search.fit(X_train_resampled, y_train_encoded)
-            model = grid_search.best_estimator_
-            st.write("Best Hyperparameters:", grid_search.best_params_)
-        else:
-            model = GaussianNB()
-            model.fit(X_train_resampled, y_train_encoded)
-
-        # Evaluate model
-        y_pred_train = model.predict(X_train_resampled)
-        y_pred_test = model.predict(X_test)
-
-        train_accuracy = accuracy_score(y_train_encoded, y_pred_train)
-        test_accuracy = accuracy_score(y_test_encoded, y_pred_test)
-        test_f1 = f1_score(y_test_encoded, y_pred_test, average='weighted')
-        test_precision = precision_score(y_test_encoded, y_pred_test, average='weighted')
-        test_recall = recall_score(y_test_encoded, y_pred_test, average='weighted')
-
-        train_class_report = classification_report(y_train_encoded, y_pred_train, target_names=label_encoder.classes_)
-        test_class_report = classification_report(y_test_encoded, y_pred_test, target_names=label_encoder.classes_)
-
-        # Append results
-        new_row = pd.DataFrame({
-            'Balancing Method': [method_name],
-            'Train Accuracy': [train_accuracy],
-            'Test Accuracy': [test_accuracy],
-            'Test F1 Score': [test_f1],
-            'Test Precision': [test_precision],
-            'Test Recall': [test_recall],
-            'Train Classification Report': [train_class_report],
-            'Test Classification Report': [test_class_report]
-        })
-        results_df = pd.concat([results_df, new_row], ignore_index=True)
+    # Every balancing method runs as its own task; rows appear as each one finishes
+    task = partial(
+        evaluate_method,
+        model=GaussianNB(),
+        search_model=GaussianNB(),
+        param_grid=param_grid,
+        tune=use_hyperparameter_tuning == "Yes",
+        sampling_strategy=sampling_strategy,
+        random_state=random_state,
+        search_options={'return_train_score': True},
+        **search_settings,
+    )
+    results_df = pd.DataFrame(columns=RESULT_COLUMNS)
+    results_placeholder = st.empty()
+    if use_hyperparameter_tuning == "Yes" and selected_balancing_methods:
+        st.write("Performing Hyperparameter Tuning...")
+
+    data_split = (X_train, X_test, y_train, y_test)
+    for method_name, outcome in compare_methods(
+        selected_balancing_methods, task, data_split, "Naive Bayes comparison", on_progress=search_progress()
+    ):
+        if "error" in outcome:
+            st.error(f"{method_name} failed: {outcome['error']}")
+            continue
+        st.write(f"{method_name} finished in {outcome['elapsed']:.1f} s")
+        show_search_outcome(method_name, outcome)
+        results_df = pd.concat([results_df, pd.DataFrame([outcome["row"]])], ignore_index=True)
+        with results_placeholder.container():
+            st.write("Results so far", results_df)
 
     # Display results
-    st.write("Results", results_df)
+    with results_placeholder.container():
+        st.write("Results", results_df)
 
     # Download option
     @st.cache_data
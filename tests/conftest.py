@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+
+def counts_dataset(n_samples=40, n_genes=300, n_classes=2, seed=0, mean=5, shift=2, signal=10, dtype=np.int32):
+    """Tied integer counts (negative binomial) with every class present and a few class-shifted genes"""
+    rng = np.random.default_rng(seed)
+    y = rng.permutation(np.arange(n_samples) % n_classes)
+    X = rng.negative_binomial(5, 5 / (5 + mean), size=(n_samples, n_genes))
+    X[:, :signal] += y[:, None] * shift
+    return X.astype(dtype), y
+
+
+@pytest.fixture
+def make_counts():
+    """Factory of (X, y) count datasets shared by the kernel tests"""
+    return counts_dataset
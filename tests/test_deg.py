@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from utils.deg import fast_screen, median_of_ratios, race_condition_metadata, race_contrasts
+
+
+def test_race_condition_metadata_builds_group_levels_for_counts_samples():
+    counts = pd.DataFrame(
+        {"ENSG1": [1, 2, 3, 4]},
+        index=["TCGA-A-01A", "TCGA-A-11A", "TCGA-B-01A", "TCGA-C-11A"],
+    )
+    phenotype = pd.DataFrame({
+        "submitter_id.samples": ["TCGA-A-01A", "TCGA-A-11A", "TCGA-A-11A", "TCGA-B-01A", "TCGA-Z-01A"],
+        "race.demographic": ["White", "white ", "asian", "Black or African American", "asian"],
+    })
+
+    metadata = race_condition_metadata(counts, phenotype)
+
+    # The first phenotype row of a duplicated sample wins; samples missing from it are dropped
+    expected = pd.DataFrame(
+        {
+            "Race": ["white", "white", "black or african american"],
+            "Condition": ["cancer", "normal", "cancer"],
+            "Group": ["white-cancer", "white-normal", "black-or-african-american-cancer"],
+        },
+        index=["TCGA-A-01A", "TCGA-A-11A", "TCGA-B-01A"],
+    )
+    pd.testing.assert_frame_equal(metadata, expected, check_names=False)
+
+
+def test_race_contrasts_only_cover_races_with_both_conditions():
+    metadata = pd.DataFrame({
+        "Race": ["white", "white", "asian", "asian", "black"],
+        "Group": ["white-cancer", "white-normal", "asian-cancer", "asian-normal", "black-cancer"],
+    })
+    assert race_contrasts(metadata) == {
+        "asian": ("Group", "asian-cancer", "asian-normal"),
+        "white": ("Group", "white-cancer", "white-normal"),
+    }
+
+
+def _screen_data(make_counts):
+    X, y = make_counts(n_samples=30, n_genes=120)
+    X[:, 5] = 0
+    samples = [f"S{i}" for i in range(len(y))]
+    counts = pd.DataFrame(X, index=samples, columns=[f"ENSG{i}" for i in range(X.shape[1])])
+    metadata = pd.DataFrame({"Group": np.where(y == 1, "cancer", "normal")}, index=samples)
+    log_cpm = np.log2((X + 0.5) / (X.sum(axis=1, keepdims=True) + 1.0) * 1e6)
+    return counts, metadata, log_cpm[y == 1], log_cpm[y == 0]
+
+
+def test_median_of_ratios_matches_dense_computation(make_counts):
+    X, _ = make_counts(n_samples=12, n_genes=50, mean=20)
+    X[:, :3] = 0
+    log_values = np.log(X[:, (X > 0).all(axis=0)].astype(np.float64))
+    expected = np.exp(np.median(log_values - log_values.mean(axis=0), axis=1))
+    np.testing.assert_allclose(median_of_ratios(X, block_size=7), expected, rtol=1e-12)
+
+
+def test_fast_screen_welch_matches_scipy(make_counts):
+    counts, metadata, x, y = _screen_data(make_counts)
+    screen = fast_screen(counts, metadata, ("Group", "cancer", "normal"), test="welch")
+
+    expected = stats.ttest_ind(x, y, axis=0, equal_var=False)
+    tested = np.arange(counts.shape[1]) != 5
+    np.testing.assert_allclose(screen["stat"].to_numpy()[tested], expected.statistic[tested], rtol=1e-10)
+    np.testing.assert_allclose(screen["pvalue"].to_numpy()[tested], expected.pvalue[tested], rtol=1e-8)
+    assert np.isnan(screen["pvalue"].iloc[5])
+
+
+def test_fast_screen_wilcoxon_matches_scipy(make_counts):
+    counts, metadata, x, y = _screen_data(make_counts)
+    screen = fast_screen(counts, metadata, ("Group", "cancer", "normal"), test="wilcoxon")
+
+    expected = stats.mannwhitneyu(x, y, axis=0, method="asymptotic")
+    tested = np.arange(counts.shape[1]) != 5
+    np.testing.assert_allclose(screen["pvalue"].to_numpy()[tested], expected.pvalue[tested], rtol=1e-10)
+    np.testing.assert_allclose(
+        screen["padj"].to_numpy()[tested], stats.false_discovery_control(expected.pvalue[tested]), rtol=1e-10
+    )
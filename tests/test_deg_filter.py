@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.deg_filter import FILTERS, DegIndex, combined_mask, filter_columns
+
+CUTOFFS = {"padj": 0.05, "log2FoldChange": 1.0, "baseMean": 10.0, "pvalue": 0.01, "lfcSE": 0.1, "stat": 2.0}
+
+
+@pytest.fixture
+def results():
+    rng = np.random.default_rng(0)
+    n = 500
+    table = pd.DataFrame({
+        "baseMean": rng.lognormal(3, 2, n),
+        "log2FoldChange": rng.normal(0, 2, n),
+        "lfcSE": rng.gamma(2, 0.2, n),
+        "stat": rng.normal(0, 3, n),
+        "pvalue": rng.uniform(0, 0.1, n),
+        "padj": rng.uniform(0, 0.2, n),
+    }, index=[f"ENSG{g:05d}" for g in range(n)])
+    for name in FILTERS:
+        table.loc[table.sample(25, random_state=len(name)).index, name] = np.nan
+    return table
+
+
+def pandas_filter(results, cutoffs):
+    keep = pd.Series(True, index=results.index)
+    for name, cutoff in cutoffs.items():
+        direction, absolute = FILTERS[name]
+        values = results[name].abs() if absolute else results[name]
+        keep &= values < cutoff if direction == "below" else values > cutoff
+    return results[keep]
+
+
+@pytest.mark.parametrize("names", [["padj"], ["log2FoldChange", "baseMean"], list(CUTOFFS)])
+def test_combined_mask_matches_pandas_filtering(results, names):
+    cutoffs = {name: CUTOFFS[name] for name in names}
+    mask = combined_mask(filter_columns(results), cutoffs)
+    pd.testing.assert_frame_equal(results[mask], pandas_filter(results, cutoffs))
+    pd.testing.assert_frame_equal(DegIndex(results).filter(cutoffs), pandas_filter(results, cutoffs))
+
+
+@pytest.mark.parametrize("name", list(FILTERS))
+def test_deg_index_counts_match_pandas_filtering(results, name):
+    index = DegIndex(results)
+    grid, kept = index.kept_curve(name, n_points=20)
+    expected = [len(pandas_filter(results, {name: cutoff})) for cutoff in grid]
+    np.testing.assert_array_equal(kept, expected)
+    assert index.count_passing(name, CUTOFFS[name]) == len(pandas_filter(results, {name: CUTOFFS[name]}))
@@ -0,0 +1,35 @@
+import os
+import time
+
+from utils.jobs import JobRunner
+from utils.scheduler import ComputeScheduler
+
+
+def _crash(report, n_cpus):
+    os._exit(1)
+
+
+def _answer(report, n_cpus):
+    return 42
+
+
+def _wait_for(runner, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = runner.status(job_id)
+        if status and status["state"] not in ("queued", "running"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"{job_id} did not finish: {runner.status(job_id)}")
+
+
+def test_jobs_run_after_a_worker_crash_breaks_the_pool(tmp_path):
+    scheduler = ComputeScheduler(total_cpus=2)
+    runner = JobRunner(scheduler, root=str(tmp_path))
+
+    assert _wait_for(runner, runner.submit("crash", _crash, cpus=2))["state"] == "failed"
+    assert scheduler._free == 2
+
+    assert _wait_for(runner, runner.submit("answer", _answer, cpus=2))["state"] == "done"
+    assert runner.result("answer") == 42
+    assert scheduler._free == 2
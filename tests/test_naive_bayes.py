@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import ParameterGrid
+from sklearn.naive_bayes import GaussianNB
+
+from utils.naive_bayes import gaussian_nb_scores
+from utils.search import budgeted_search, grid_scores
+
+CANDIDATES = list(ParameterGrid({"var_smoothing": np.logspace(0, -9, num=100)}))
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_gaussian_nb_scores_match_grid_search(n_classes, make_counts):
+    X, y = make_counts(n_samples=90, n_genes=200, mean=100, shift=30, n_classes=n_classes, seed=n_classes)
+    np.testing.assert_allclose(
+        gaussian_nb_scores(GaussianNB(), CANDIDATES, X, y, 5, "accuracy", 2),
+        grid_scores(GaussianNB(), CANDIDATES, X, y, 5, "accuracy", 1),
+    )
+
+
+def test_budgeted_search_picks_the_same_smoothing(make_counts):
+    X, y = make_counts(n_samples=90, n_genes=200, mean=100, shift=30, seed=4)
+    expected = budgeted_search(GaussianNB(), CANDIDATES, X, y)
+    actual = budgeted_search(GaussianNB(), CANDIDATES, X, y, score_candidates=gaussian_nb_scores)
+    assert actual == expected
+
+
+def test_budgeted_search_scores_the_whole_sweep_in_one_call(make_counts):
+    X, y = make_counts(n_samples=90, n_genes=200, mean=100, shift=30)
+    calls = []
+
+    def engine(estimator, candidates, *args):
+        calls.append(len(candidates))
+        return gaussian_nb_scores(estimator, candidates, *args)
+    engine.whole_sweep = True
+
+    budgeted_search(GaussianNB(), CANDIDATES, X, y, score_candidates=engine)
+    assert calls == [len(CANDIDATES)]
+    assert gaussian_nb_scores.whole_sweep
+
+
+def test_fixed_priors_fall_back_to_grid_search(make_counts):
+    X, y = make_counts(n_samples=90, n_genes=200, mean=100, shift=30)
+    estimator = GaussianNB(priors=[0.5, 0.5])
+    np.testing.assert_allclose(
+        gaussian_nb_scores(estimator, CANDIDATES[:5], X, y, 5, "accuracy", 1),
+        grid_scores(estimator, CANDIDATES[:5], X, y, 5, "accuracy", 1),
+    )
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.preprocess import preprocess_counts
+
+
+def gene_counts(make_counts, dtype=np.float64):
+    """Genes x samples frame with fractional values, NaNs and all-zero genes, as uploads arrive"""
+    X, _ = make_counts(n_samples=20, n_genes=400, dtype=dtype)
+    X = X.T
+    if dtype == np.float64:
+        X[::7] += 0.4
+        X[3, 5] = np.nan
+    X[10:30] = 0
+    return pd.DataFrame(
+        X, index=[f"ENSG{g:05d}" for g in range(X.shape[0])], columns=[f"S{i}" for i in range(X.shape[1])]
+    )
+
+
+def pandas_chain(counts, drop_empty=True):
+    rounded = counts.fillna(0).round().astype(int)
+    if drop_empty:
+        rounded = rounded[rounded.sum(axis=1) > 0]
+    return rounded.T
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.int32])
+@pytest.mark.parametrize("drop_empty", [True, False])
+def test_preprocess_counts_matches_the_pandas_chain(make_counts, dtype, drop_empty):
+    counts = gene_counts(make_counts, dtype)
+    result = preprocess_counts(counts, drop_empty=drop_empty, block_size=64)
+    expected = pandas_chain(counts, drop_empty)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    # Small counts are stored in the narrowest integer dtype rather than int64
+    assert set(result.dtypes) == {np.dtype(np.int16)}
@@ -0,0 +1,31 @@
+import numpy as np
+from imblearn.over_sampling import RandomOverSampler
+
+from utils.resample_cache import ResampleCache, cached_fit_resample
+
+
+class CountingSampler:
+    """RandomOverSampler that counts its fit_resample calls"""
+
+    def __init__(self):
+        self.sampler = RandomOverSampler(random_state=0)
+        self.calls = 0
+
+    def fit_resample(self, X, y):
+        self.calls += 1
+        return self.sampler.fit_resample(X, y)
+
+
+def test_object_labels_are_served_from_the_cache(tmp_path, make_counts):
+    X, y = make_counts(n_samples=30, n_genes=20)
+    y = np.where(np.arange(len(y)) < 20, "tumor", "normal").astype(object)
+    cache = ResampleCache(root=str(tmp_path))
+    sampler = CountingSampler()
+
+    first = cached_fit_resample(sampler, "RandomOverSampler", X, y, "auto", 0, cache=cache)
+    second = cached_fit_resample(sampler, "RandomOverSampler", X, y, "auto", 0, cache=cache)
+
+    assert sampler.calls == 1
+    np.testing.assert_array_equal(second[0], first[0])
+    assert second[1].dtype == object
+    assert list(second[1]) == list(first[1])
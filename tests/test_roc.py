@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score, roc_curve
+
+from utils.roc import AucState, _bootstrap_block, auc_significance, bootstrap_weights, cutoff_table, gene_auc
+
+
+@pytest.mark.parametrize("block_size", [7, 2048])
+def test_gene_auc_matches_roc_auc_score(block_size, make_counts):
+    X, y = make_counts()
+    expected = [roc_auc_score(y, X[:, j]) for j in range(X.shape[1])]
+    np.testing.assert_allclose(gene_auc(X, y, block_size=block_size), expected, atol=1e-12)
+
+
+def test_gene_auc_is_nan_with_a_single_class(make_counts):
+    X, _ = make_counts()
+    assert np.isnan(gene_auc(X, np.ones(X.shape[0]))).all()
+
+
+@pytest.mark.parametrize("block_size", [7, 2048])
+def test_cutoff_table_matches_roc_curve(block_size, make_counts):
+    X, y = make_counts()
+    table = cutoff_table(X, y, specificities=(0.90, 0.95), block_size=block_size)
+    for j in range(X.shape[1]):
+        fpr, tpr, thresholds = roc_curve(y, X[:, j], drop_intermediate=False)
+        youden = tpr - fpr
+        best = np.argmax(youden)
+        assert table["Youden_J"][j] == pytest.approx(youden[best])
+        if youden[best] > 0:
+            assert table["Youden_Cutoff"][j] == thresholds[best]
+        for specificity in (0.90, 0.95):
+            expected = tpr[fpr <= 1 - specificity + 1e-12].max()
+            assert table[f"Sensitivity@{specificity:.0%}Spec"][j] == pytest.approx(expected)
+
+
+def naive_bootstrap_aucs(X, y, weights):
+    """AUC of every gene on each replicate's explicitly resampled rows"""
+    aucs = np.empty((weights.shape[0], X.shape[1]))
+    for b, w in enumerate(weights):
+        rows = np.repeat(np.arange(X.shape[0]), w.astype(int))
+        aucs[b] = [roc_auc_score(y[rows], X[rows, j]) for j in range(X.shape[1])]
+    return aucs
+
+
+def test_bootstrap_weights_are_stratified(make_counts):
+    _, y = make_counts()
+    weights = bootstrap_weights(y, 50, np.random.default_rng(0))
+    np.testing.assert_array_equal(weights[:, y == 1].sum(axis=1), (y == 1).sum())
+    np.testing.assert_array_equal(weights[:, y == 0].sum(axis=1), (y == 0).sum())
+
+
+def test_bootstrap_block_matches_resampled_roc_auc_score(make_counts):
+    X, y = make_counts(n_genes=40)
+    weights = bootstrap_weights(y, 30, np.random.default_rng(1))
+    np.testing.assert_allclose(
+        _bootstrap_block(X.astype(float), y.astype(bool), weights),
+        naive_bootstrap_aucs(X, y, weights),
+        atol=1e-12,
+    )
+
+
+def test_auc_significance_matches_naive_resampling(make_counts):
+    X, y = make_counts(n_genes=25)
+    n_boot, n_perm = 40, 60
+    result = auc_significance(X, y, n_boot=n_boot, n_perm=n_perm, random_state=3, n_jobs=2, block_size=8)
+
+    # Same draws as auc_significance: bootstrap weights, then one permutation per replicate
+    rng = np.random.default_rng(3)
+    boot = naive_bootstrap_aucs(X, y, bootstrap_weights(y, n_boot, rng))
+    shuffled = rng.permuted(np.tile(np.arange(y.size), (n_perm, 1)), axis=1)
+    observed = gene_auc(X, y)
+    exceed = np.zeros(X.shape[1])
+    for order in shuffled:
+        y_perm = np.zeros_like(y)
+        y_perm[order[:y.sum()]] = 1
+        exceed += np.array([roc_auc_score(y_perm, X[:, j]) for j in range(X.shape[1])]) >= observed - 1e-12
+
+    np.testing.assert_allclose(result["AUC_CI_low"], np.quantile(boot, 0.025, axis=0), atol=1e-12)
+    np.testing.assert_allclose(result["AUC_CI_high"], np.quantile(boot, 0.975, axis=0), atol=1e-12)
+    np.testing.assert_allclose(result["perm_pvalue"], (exceed + 1) / (n_perm + 1))
+    assert (result["perm_padj"] >= result["perm_pvalue"]).all()
+
+
+def test_auc_state_appends_match_a_full_recompute(tmp_path, make_counts):
+    X, y = make_counts(n_samples=60)
+    genes = [f"ENSG{j:05d}" for j in range(X.shape[1])]
+    state = AucState.from_matrix(X[:30], y[:30], genes)
+    # Batches with only one class, and an empty one, are valid appends
+    for rows in (slice(30, 31), slice(31, 31), slice(31, 45), slice(45, 60)):
+        state = state.appended(X[rows], y[rows])
+
+    np.testing.assert_allclose(state.auc(), gene_auc(X, y), atol=1e-12)
+    assert (state.n_pos, state.n_neg) == ((y == 1).sum(), (y == 0).sum())
+
+    path = str(tmp_path / "state.npz")
+    state.save(path)
+    loaded = AucState.load(path)
+    np.testing.assert_array_equal(loaded.auc(), state.auc())
+    np.testing.assert_array_equal(loaded.genes, genes)
+
+
+def test_auc_state_is_nan_until_both_classes_are_seen(make_counts):
+    X, y = make_counts()
+    state = AucState.from_matrix(X[y == 1], y[y == 1], range(X.shape[1]))
+    assert np.isnan(state.auc()).all()
+    np.testing.assert_allclose(state.appended(X[y == 0], y[y == 0]).auc(), gene_auc(X, y), atol=1e-12)
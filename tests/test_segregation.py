@@ -0,0 +1,45 @@
+import pandas as pd
+
+from utils.segregation import matched_columns, partition_by_race, stream_partitions
+
+PHENOTYPE = pd.DataFrame({
+    "submitter_id.samples": ["S1", "S2", "S3", "S4", "S5", "S6"],
+    "race.demographic": ["white", "Black or African American ", "WHITE", "asian", "white", None],
+})
+
+
+def write_counts(path, samples, n_genes=12):
+    counts = pd.DataFrame(
+        {sample: range(i, i + n_genes) for i, sample in enumerate(samples)},
+        index=pd.Index([f"ENSG{g:05d}" for g in range(n_genes)], name="Ensembl_ID"),
+    )
+    counts.reset_index().to_csv(path, index=False)
+    return counts.reset_index()
+
+
+def test_partition_by_race_normalizes_case_and_whitespace():
+    partitions = partition_by_race(PHENOTYPE)
+    assert partitions == {
+        "asian": ["S4"],
+        "black or african american": ["S2"],
+        "white": ["S1", "S3", "S5"],
+    }
+
+
+def test_matched_columns_keeps_phenotype_order_and_skips_missing_samples():
+    header = pd.Index(["Ensembl_ID", "S3", "S1", "S9"])
+    assert matched_columns(["S1", "S2", "S3"], header) == ["Ensembl_ID", "S1", "S3"]
+
+
+def test_stream_partitions_matches_per_race_selection(tmp_path):
+    counts_path = tmp_path / "counts.csv"
+    counts = write_counts(counts_path, ["S5", "S1", "S2", "S4", "S7"])
+    partitions = partition_by_race(PHENOTYPE)
+    outputs = {str(tmp_path / f"matched_{race}.csv"): ids for race, ids in partitions.items()}
+
+    stream_partitions(str(counts_path), outputs, chunksize=5)
+
+    for path, sample_ids in outputs.items():
+        # What the page did before: select the matched columns from the fully loaded counts
+        expected = counts[["Ensembl_ID"] + [s for s in sample_ids if s in counts.columns[1:]]]
+        pd.testing.assert_frame_equal(pd.read_csv(path), expected)
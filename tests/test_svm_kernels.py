@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+from sklearn.model_selection import ParameterGrid
+from sklearn.svm import SVC
+
+from utils.search import grid_scores
+from utils.svm_kernels import svm_kernel_scores
+
+
+CANDIDATES = list(ParameterGrid({
+    "kernel": ["poly", "rbf", "linear", "sigmoid"],
+    "C": [0.1, 10],
+    "gamma": [0.01, "scale"],
+    "coef0": [0, 1],
+    "class_weight": [None, "balanced"],
+}))
+
+
+def reference_scores(X, y):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return grid_scores(SVC(), CANDIDATES, X, y, 5, "accuracy", 1)
+
+
+def test_svm_kernel_scores_match_grid_search(make_counts):
+    X, y = make_counts(n_samples=60, n_genes=40, dtype=np.int16)
+    actual = svm_kernel_scores(SVC(), CANDIDATES, X, y, 5, "accuracy", 2)
+    np.testing.assert_allclose(actual, reference_scores(X, y))
+
+
+def test_float32_gram_matrices_stay_within_a_few_test_samples(make_counts):
+    X, y = make_counts(n_samples=60, n_genes=40, dtype=np.int16)
+    actual = svm_kernel_scores(SVC(), CANDIDATES, X, y, 5, "accuracy", 2, dtype=np.float32)
+    # Rounding can flip borderline predictions (sigmoid kernels are the most sensitive);
+    # each flipped sample moves the mean fold accuracy by 1 / n_samples
+    assert np.abs(actual - reference_scores(X, y)).max() <= 2 / len(y) + 1e-12
+
+
+def test_svm_kernel_scores_reuse_the_cache_for_later_chunks(make_counts):
+    X, y = make_counts(n_samples=60, n_genes=40, dtype=np.int16, seed=1)
+    candidates = list(ParameterGrid({"kernel": ["rbf"], "C": [0.1, 1, 10], "gamma": [0.01, 0.1]}))
+    whole = svm_kernel_scores(SVC(), candidates, X, y, 5, "accuracy", 1)
+    chunks = [svm_kernel_scores(SVC(), candidates[i:i + 2], X, y, 5, "accuracy", 1) for i in range(0, 6, 2)]
+    np.testing.assert_array_equal(np.concatenate(chunks), whole)
+
+
+def test_other_scorers_fall_back_to_grid_search(make_counts):
+    X, y = make_counts(n_samples=60, n_genes=40, dtype=np.int16)
+    candidates = [{"kernel": "rbf", "C": 1.0}]
+    np.testing.assert_allclose(
+        svm_kernel_scores(SVC(), candidates, X, y, 3, "f1", 1),
+        grid_scores(SVC(), candidates, X, y, 3, "f1", 1),
+    )
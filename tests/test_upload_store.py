@@ -0,0 +1,65 @@
+import io
+import os
+import time
+
+from utils.upload_store import UploadStore
+
+
+class Upload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile"""
+
+    def __init__(self, content, name="counts.csv", file_id=None):
+        super().__init__(content)
+        self.name = name
+        self.file_id = file_id or name
+
+
+def age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_put_stores_identical_content_once(tmp_path):
+    store = UploadStore(str(tmp_path))
+    first = store.put(Upload(b"a,b\n1,2\n", "one.csv", "id1"))
+    second = store.put(Upload(b"a,b\n1,2\n", "two.csv", "id2"))
+    assert first == second
+    assert os.listdir(tmp_path) == [os.path.basename(first[1])]
+
+
+def test_least_recently_used_groups_are_evicted_over_the_size_limit(tmp_path):
+    store = UploadStore(str(tmp_path), max_bytes=250)
+    _, old_path = store.put(Upload(b"a" * 100, file_id="old"))
+    _, recent_path = store.put(Upload(b"b" * 100, file_id="recent"))
+    # A cached matrix shares its upload's digest prefix and goes with it
+    derived = old_path.replace(".csv", ".values.npy")
+    with open(derived, "wb") as f:
+        f.write(b"x")
+    age(old_path, 60)
+    age(derived, 60)
+
+    _, new_path = store.put(Upload(b"c" * 100, file_id="new"))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in (recent_path, new_path))
+
+
+def test_entries_older_than_max_age_are_evicted(tmp_path):
+    store = UploadStore(str(tmp_path), max_age=3600)
+    _, stale_path = store.put(Upload(b"stale", file_id="stale"))
+    age(stale_path, 7200)
+    _, fresh_path = store.put(Upload(b"fresh", file_id="fresh"))
+    assert os.listdir(tmp_path) == [os.path.basename(fresh_path)]
+
+
+def test_the_upload_being_stored_is_never_evicted(tmp_path):
+    store = UploadStore(str(tmp_path), max_bytes=10)
+    _, path = store.put(Upload(b"z" * 100, file_id="big"))
+    assert os.path.exists(path)
+
+
+def test_eviction_drops_digest_memo_entries(tmp_path):
+    store = UploadStore(str(tmp_path), max_bytes=150)
+    store.put(Upload(b"a" * 100, file_id="evicted"))
+    age(next(tmp_path.iterdir()), 60)
+    store.put(Upload(b"b" * 100, file_id="kept"))
+    assert set(store._digests) == {"kept"}
@@ -0,0 +1 @@
+"""Shared computation helpers used by the Streamlit pages."""
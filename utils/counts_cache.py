@@ -0,0 +1,102 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocess import narrowest_int_dtype
+from utils.upload_store import get_upload_store
+
+LOAD_ATTEMPTS = 3
+
+
+def _part_path(root, digest, part):
+    return os.path.join(root, f"{digest}.{part}.npy")
+
+
+def _save_atomic(path, array):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def compact_values(values):
+    """Narrowest integer dtype for integral counts, float64 otherwise"""
+    if values.dtype.kind == "f":
+        if np.isnan(values).any() or not np.array_equal(values, np.floor(values)):
+            return values
+        low, high = values.min(initial=0), values.max(initial=0)
+    elif values.dtype.kind in "iu":
+        low, high = values.min(initial=0), values.max(initial=0)
+    else:
+        return values.astype(np.float64)
+    try:
+        return values.astype(narrowest_int_dtype(low, high), copy=False)
+    except OverflowError:
+        return values
+
+
+def _write_matrix(root, digest, path):
+    """Parses the stored upload once and persists it as .npy values plus index arrays"""
+    if path.endswith(".xlsx"):
+        frame = pd.read_excel(path, engine="openpyxl", index_col=0)
+    else:
+        frame = pd.read_csv(path, index_col=0)
+
+    values = frame.to_numpy()
+    if values.dtype == object:
+        frame = frame.apply(pd.to_numeric)
+        values = frame.to_numpy()
+    _save_atomic(_part_path(root, digest, "values"), compact_values(values))
+    _save_atomic(_part_path(root, digest, "index"), frame.index.to_numpy().astype(str))
+    _save_atomic(_part_path(root, digest, "columns"), frame.columns.to_numpy().astype(str))
+    index_name = frame.index.name or "Ensembl_ID"
+    with open(os.path.join(root, f"{digest}.name.txt"), "w") as f:
+        f.write(index_name)
+
+
+def _map_matrix(root, digest):
+    """Memory-maps the cached matrix without copying the values"""
+    values = np.load(_part_path(root, digest, "values"), mmap_mode="r")
+    index = np.load(_part_path(root, digest, "index"))
+    columns = np.load(_part_path(root, digest, "columns"))
+    with open(os.path.join(root, f"{digest}.name.txt")) as f:
+        index_name = f.read()
+    return pd.DataFrame(
+        values,
+        index=pd.Index(index, name=index_name),
+        columns=pd.Index(columns),
+        copy=False,
+    )
+
+
+def with_index_column(counts, index_col):
+    """Counts indexed by another column of the upload; the cached first column becomes a regular column"""
+    if index_col == counts.index.name:
+        return counts
+    return counts.reset_index().set_index(index_col)
+
+
+def load_counts(uploaded_file):
+    """Genes x samples counts indexed by the first column, mapped from the columnar cache
+
+    The first load of a given content parses the text once; every later load in any page or
+    session memory-maps the cached binary matrix.
+    """
+    store = get_upload_store()
+    for _ in range(LOAD_ATTEMPTS):
+        digest, path = store.put(uploaded_file)
+        # Eviction runs under the store lock, so the cached files cannot vanish while being opened
+        with store.lock:
+            try:
+                return _map_matrix(store.root, digest)
+            except FileNotFoundError:
+                pass
+        try:
+            _write_matrix(store.root, digest, path)
+        except FileNotFoundError:
+            # The upload itself was evicted mid-parse; put() restores it on the next attempt
+            continue
+    with store.lock:
+        return _map_matrix(store.root, digest)
@@ -0,0 +1,255 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import stats
+from pydeseq2.dds import DeseqDataSet
+from pydeseq2.ds import DeseqStats
+
+from utils.scheduler import CPUS_PER_JOB
+from utils.segregation import RACE_COLUMN
+
+SESSION_RESULTS_KEY = "deg_results"
+SESSION_RESULTS_LIMIT = 8
+HASH_ROWS = 256
+SCREEN_BLOCK = 4096
+RESULT_COLUMNS = ["baseMean", "log2FoldChange", "lfcSE", "stat", "pvalue", "padj"]
+
+DESEQ2_STAGES = [
+    ("fit_size_factors", "Fitting size factors"),
+    ("fit_genewise_dispersions", "Fitting genewise dispersions"),
+    ("fit_dispersion_trend", "Fitting dispersion trend"),
+    ("fit_MAP_dispersions", "Fitting MAP dispersions"),
+    ("fit_LFC", "Fitting log fold changes"),
+    ("calculate_cooks", "Calculating Cook's distances"),
+]
+
+
+def counts_fingerprint(counts):
+    """Content hash of a counts frame (values, genes and samples)"""
+    values = counts.to_numpy()
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str((values.shape, values.dtype.str)).encode())
+    # Row blocks keep the hash independent of memory layout without copying the whole matrix
+    for start in range(0, values.shape[0], HASH_ROWS):
+        hasher.update(np.ascontiguousarray(values[start:start + HASH_ROWS]).data)
+    hasher.update(pd.util.hash_pandas_object(counts.index, index=False).to_numpy().tobytes())
+    hasher.update(pd.util.hash_pandas_object(counts.columns.to_series(), index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def fit_key(counts, metadata, design_factors, contrast):
+    """Cache key of a DESeq2 fit: counts content, sample metadata, design and contrast"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(counts_fingerprint(counts).encode())
+    hasher.update(pd.util.hash_pandas_object(metadata).to_numpy().tobytes())
+    hasher.update(repr((design_factors, contrast)).encode())
+    return hasher.hexdigest()
+
+
+def _report_stages(dds, report):
+    """Wraps the DESeq2 steps of a dataset so each one reports progress before it runs"""
+    for position, (method, label) in enumerate(DESEQ2_STAGES):
+        step = getattr(dds, method)
+
+        def reporting_step(*args, _step=step, _label=label, _position=position, **kwargs):
+            report(_label, _position / (len(DESEQ2_STAGES) + 1))
+            return _step(*args, **kwargs)
+
+        setattr(dds, method, reporting_step)
+
+
+def fit_deseq2(counts, metadata, design_factors, n_cpus=-1, report=None):
+    """Fits the DESeq2 model; report(stage, fraction) is called before each stage when given"""
+    dds = DeseqDataSet(
+        counts=counts,
+        metadata=metadata,
+        design_factors=design_factors,
+        n_cpus=n_cpus
+    )
+    if report is not None:
+        _report_stages(dds, report)
+    dds.deseq2()
+    return dds
+
+
+def run_deseq2(counts, metadata, design_factors, contrast, n_cpus=-1, report=None):
+    """Fits DESeq2 and returns the Wald test results table"""
+    dds = fit_deseq2(counts, metadata, design_factors, n_cpus, report)
+
+    stat_res = DeseqStats(dds, contrast=contrast)
+    if report is not None:
+        report("Running Wald tests", len(DESEQ2_STAGES) / (len(DESEQ2_STAGES) + 1))
+    stat_res.summary()
+    return stat_res.results_df
+
+
+def race_condition_metadata(counts, phenotype):
+    """Race, Condition and a combined Group level for every counts sample found in the phenotype
+
+    Group levels ("<race>-<condition>", hyphenated) are valid pydeseq2 factor levels, so one
+    fit with design ~Group can serve a cancer-vs-normal contrast per race.
+    """
+    race = phenotype.set_index(phenotype.columns[0])[RACE_COLUMN].str.strip().str.lower()
+    race = race[~race.index.duplicated()].reindex(counts.index).dropna()
+    condition = ["cancer" if "-01" in sample else "normal" for sample in race.index]
+    metadata = pd.DataFrame({"Race": race.to_numpy(), "Condition": condition}, index=race.index)
+    metadata["Group"] = metadata["Race"].str.replace(r"[^a-z0-9]+", "-", regex=True) + "-" + metadata["Condition"]
+    return metadata
+
+
+def race_contrasts(metadata):
+    """Per-race (Group, cancer level, normal level) contrasts for races with both conditions"""
+    contrasts = {}
+    for race, groups in metadata.groupby("Race")["Group"]:
+        levels = set(groups)
+        cancer = next((level for level in levels if level.endswith("-cancer")), None)
+        normal = next((level for level in levels if level.endswith("-normal")), None)
+        if cancer and normal:
+            contrasts[race] = ("Group", cancer, normal)
+    return contrasts
+
+
+def run_multi_race_deseq2(counts, metadata, contrasts, n_cpus=-1, report=None):
+    """One DESeq2 fit on ~Group, then a cancer-vs-normal Wald test per race from that fit"""
+    dds = fit_deseq2(counts, metadata[["Group"]], "Group", n_cpus, report)
+
+    results = {}
+    for position, (race, contrast) in enumerate(contrasts.items()):
+        if report is not None:
+            fraction = (len(DESEQ2_STAGES) + position / len(contrasts)) / (len(DESEQ2_STAGES) + 1)
+            report(f"Running Wald tests: {race}", fraction)
+        stat_res = DeseqStats(dds, contrast=list(contrast), quiet=True)
+        stat_res.summary()
+        results[race] = stat_res.results_df
+    return results
+
+
+def submit_multi_race_deseq2(runner, counts, metadata, restart=False):
+    """Queues the single multi-race fit; the job ID covers counts, groups and contrasts"""
+    contrasts = race_contrasts(metadata)
+    job_id = fit_key(counts, metadata[["Group"]], "Group", tuple(contrasts.items()))
+    return runner.submit(job_id, run_multi_race_deseq2, counts, metadata, contrasts, restart=restart)
+
+
+def low_count_mask(counts, min_count=10, min_samples=1, min_cpm=0.0):
+    """Genes with at least min_count reads and min_cpm CPM in at least min_samples samples"""
+    values = counts.to_numpy()
+    library_sizes = np.asarray(values.sum(axis=1), dtype=np.float64)
+    min_reads = np.maximum(min_count, min_cpm * library_sizes / 1e6)
+    keep = np.empty(values.shape[1], dtype=bool)
+    for start in range(0, values.shape[1], SCREEN_BLOCK):
+        block = slice(start, start + SCREEN_BLOCK)
+        keep[block] = (values[:, block] >= min_reads[:, None]).sum(axis=0) >= min_samples
+    return keep
+
+
+def median_of_ratios(counts, block_size=SCREEN_BLOCK):
+    """DESeq2 size factors from genes expressed in every sample, library size ratios as fallback
+
+    Gene geometric means are taken block by block and the ratios one sample row at a time,
+    so the counts matrix is never copied whole to float64.
+    """
+    values = np.asarray(counts)
+    n_samples, n_genes = values.shape
+    expressed = np.empty(n_genes, dtype=bool)
+    log_means = np.empty(n_genes)
+    for start in range(0, n_genes, block_size):
+        block = slice(start, start + block_size)
+        raw = values[:, block]
+        expressed[block] = (raw > 0).all(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_means[block] = np.log(raw.astype(np.float64)).mean(axis=0)
+    if expressed.any():
+        genes = np.flatnonzero(expressed)
+        log_means = log_means[genes]
+        return np.array([
+            np.exp(np.median(np.log(values[i, genes].astype(np.float64)) - log_means))
+            for i in range(n_samples)
+        ])
+    library_sizes = values.sum(axis=1, dtype=np.float64)
+    return library_sizes / np.exp(np.log(library_sizes).mean())
+
+
+def benjamini_hochberg(pvalues):
+    """BH adjusted p-values, NaN where the p-value is NaN"""
+    padj = np.full(pvalues.shape, np.nan)
+    tested = ~np.isnan(pvalues)
+    if tested.any():
+        padj[tested] = stats.false_discovery_control(pvalues[tested])
+    return padj
+
+
+def fast_screen(counts, metadata, contrast, test="welch"):
+    """Approximate DEG table with DESeq2's columns from log-CPM and a vectorized two-sample test
+
+    Genes are processed in column blocks; test is "welch" (Welch t-test) or "wilcoxon"
+    (Mann-Whitney rank-sum). log2FoldChange is the difference of mean log2-CPM between the
+    contrast groups, lfcSE its Welch standard error and baseMean the mean of size-factor
+    normalized counts.
+    """
+    factor, numerator, denominator = contrast
+    groups = metadata.loc[counts.index, factor].to_numpy()
+    in_num, in_den = groups == numerator, groups == denominator
+    n_num, n_den = in_num.sum(), in_den.sum()
+
+    library_sizes = np.asarray(counts.sum(axis=1), dtype=np.float64)
+    size_factors = median_of_ratios(counts)
+    values = counts.to_numpy()
+    columns = {name: np.empty(values.shape[1]) for name in RESULT_COLUMNS[:-1]}
+
+    for start in range(0, values.shape[1], SCREEN_BLOCK):
+        block = slice(start, start + SCREEN_BLOCK)
+        raw = np.asarray(values[:, block], dtype=np.float64)
+        log_cpm = np.log2((raw + 0.5) / (library_sizes[:, None] + 1.0) * 1e6)
+        x, y = log_cpm[in_num], log_cpm[in_den]
+
+        var_x = x.var(axis=0, ddof=1) / n_num
+        var_y = y.var(axis=0, ddof=1) / n_den
+        lfc = x.mean(axis=0) - y.mean(axis=0)
+        se = np.sqrt(var_x + var_y)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if test == "wilcoxon":
+                result = stats.mannwhitneyu(x, y, axis=0, method="asymptotic")
+                pvalue = result.pvalue
+                stat = np.sign(result.statistic - n_num * n_den / 2) * stats.norm.isf(pvalue / 2)
+            else:
+                stat = lfc / se
+                dof = (var_x + var_y) ** 2 / (var_x ** 2 / (n_num - 1) + var_y ** 2 / (n_den - 1))
+                pvalue = 2 * stats.t.sf(np.abs(stat), dof)
+
+        # Like DESeq2, genes without any counts are not tested
+        unexpressed = raw.sum(axis=0) == 0
+        stat[unexpressed] = np.nan
+        pvalue[unexpressed] = np.nan
+
+        columns["baseMean"][block] = (raw / size_factors[:, None]).mean(axis=0)
+        columns["log2FoldChange"][block] = lfc
+        columns["lfcSE"][block] = se
+        columns["stat"][block] = stat
+        columns["pvalue"][block] = pvalue
+
+    columns["padj"] = benjamini_hochberg(columns["pvalue"])
+    return pd.DataFrame(columns, index=counts.columns)[RESULT_COLUMNS]
+
+
+def submit_deseq2(runner, counts, metadata, design_factors, contrast, restart=False, cpus=CPUS_PER_JOB):
+    """Queues a DESeq2 fit on the job runner; the job ID is the fit's cache key"""
+    job_id = fit_key(counts, metadata, design_factors, contrast)
+    return runner.submit(
+        job_id, run_deseq2, counts, metadata, design_factors, contrast, restart=restart, cpus=cpus
+    )
+
+
+def session_result(key, load):
+    """Per-session LRU of loaded results so reruns skip reading them back"""
+    session_results = st.session_state.setdefault(SESSION_RESULTS_KEY, {})
+    if key in session_results:
+        session_results[key] = session_results.pop(key)
+    else:
+        session_results[key] = load(key)
+        while len(session_results) > SESSION_RESULTS_LIMIT:
+            session_results.pop(next(iter(session_results)))
+    return session_results[key]
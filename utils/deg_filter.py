@@ -0,0 +1,77 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# (results column, keep values "below" or "above" the cutoff, compare absolute values)
+FILTERS = {
+    "padj": ("below", False),
+    "log2FoldChange": ("above", True),
+    "baseMean": ("above", False),
+    "pvalue": ("below", False),
+    "lfcSE": ("above", False),
+    "stat": ("above", True),
+}
+
+
+def filter_columns(results):
+    """Float numpy columns of a DEG table, absolute where the filter compares magnitudes"""
+    columns = {}
+    for name, (_, absolute) in FILTERS.items():
+        values = results[name].to_numpy(dtype=np.float64)
+        columns[name] = np.abs(values) if absolute else values
+    return columns
+
+
+def combined_mask(columns, cutoffs):
+    """Single boolean mask of the genes passing every cutoff (NaN never passes)"""
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for name, cutoff in cutoffs.items():
+            direction, _ = FILTERS[name]
+            compare = np.less if direction == "below" else np.greater
+            mask &= compare(columns[name], cutoff)
+    return mask
+
+
+def results_digest(results):
+    """Short content digest identifying one DEG results table"""
+    hashed = pd.util.hash_pandas_object(results, index=True).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=8).hexdigest()
+
+
+class DegIndex:
+    """Filter-ready DEG results: numpy columns plus a sorted copy of each for O(log n) counts"""
+
+    def __init__(self, results):
+        self.results = results
+        self.digest = results_digest(results)
+        self.columns = filter_columns(results)
+        self.sorted = {name: np.sort(values[~np.isnan(values)]) for name, values in self.columns.items()}
+
+    def __len__(self):
+        return len(self.results)
+
+    def count_passing(self, name, cutoffs):
+        """Genes passing a single filter, for one cutoff or an array of cutoffs"""
+        direction, _ = FILTERS[name]
+        values = self.sorted[name]
+        if direction == "below":
+            return np.searchsorted(values, cutoffs, side="left")
+        return values.size - np.searchsorted(values, cutoffs, side="right")
+
+    def kept_curve(self, name, n_points=100):
+        """Cutoff grid over the value quantiles and the number of genes each cutoff keeps"""
+        values = self.sorted[name]
+        if values.size == 0:
+            return np.array([]), np.array([], dtype=int)
+        grid = np.unique(np.quantile(values, np.linspace(0, 1, n_points)))
+        return grid, self.count_passing(name, grid)
+
+    def mask(self, cutoffs):
+        """Boolean mask of the rows passing every cutoff"""
+        return combined_mask(self.columns, cutoffs)
+
+    def filter(self, cutoffs):
+        """Rows of the results passing every cutoff"""
+        return self.results[self.mask(cutoffs)]
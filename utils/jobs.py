@@ -0,0 +1,201 @@
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+from threadpoolctl import threadpool_limits
+
+from utils.scheduler import CPUS_PER_JOB, get_scheduler
+
+JOBS_DIR = os.environ.get("JOBS_DIR", os.path.join("temp", "jobs"))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "16"))
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+def _write_json(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(job_dir):
+    """Last status written for a job, or None if the job is unknown"""
+    try:
+        with open(os.path.join(job_dir, "status.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_status(job_dir, state, stage="", progress=0.0, error=None, elapsed=None):
+    _write_json(os.path.join(job_dir, "status.json"), {
+        "state": state,
+        "stage": stage,
+        "progress": progress,
+        "error": error,
+        "elapsed": elapsed,
+        "updated": time.time(),
+    })
+
+
+def _execute(job_dir, fn, args, kwargs):
+    """Worker entry point: runs fn with a progress reporter and persists its result
+
+    BLAS/OpenMP thread pools of the worker are capped to the job's CPU budget while it runs.
+    """
+    cancel_flag = os.path.join(job_dir, "cancel")
+
+    def report(stage, progress):
+        if os.path.exists(cancel_flag):
+            raise JobCancelled()
+        write_status(job_dir, "running", stage, progress)
+
+    try:
+        report("Starting", 0.0)
+        started = time.perf_counter()
+        with threadpool_limits(limits=kwargs["n_cpus"]):
+            result = fn(*args, report=report, **kwargs)
+        elapsed = time.perf_counter() - started
+        with open(os.path.join(job_dir, "result.pkl"), "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        write_status(job_dir, "done", "Finished", 1.0, elapsed=elapsed)
+    except JobCancelled:
+        write_status(job_dir, "cancelled", "Cancelled")
+    except Exception as e:
+        write_status(job_dir, "failed", "Failed", error=f"{type(e).__name__}: {e}")
+
+
+class JobRunner:
+    """Runs heavy jobs on a process pool; status and results live on disk under their job ID
+
+    Jobs are admitted by the compute scheduler and receive their granted CPU budget as n_cpus.
+    """
+
+    def __init__(self, scheduler, root=JOBS_DIR, history=JOB_HISTORY):
+        self.scheduler = scheduler
+        self.root = root
+        self.history = history
+        self._lock = threading.Lock()
+        self._tickets = {}
+        self._pool_lock = threading.Lock()
+        self._executor = self._new_executor()
+        os.makedirs(root, exist_ok=True)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.scheduler.total_cpus, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def status(self, job_id):
+        status = read_status(self.job_dir(job_id))
+        ticket = self._tickets.get(job_id)
+        if status and status["state"] in ACTIVE_STATES and ticket is None:
+            # Left behind by a previous server process, nothing is running it any more
+            status = dict(status, state="interrupted")
+        elif status and status["state"] == "queued" and not ticket.granted:
+            position = self.scheduler.position(ticket)
+            status = dict(status, stage=f"Waiting for compute (position {position} in the queue)")
+        return status
+
+    def submit(self, job_id, fn, *args, restart=False, cpus=CPUS_PER_JOB, **kwargs):
+        """Queues fn(*args, report=..., n_cpus=..., **kwargs) unless job_id is already running or finished"""
+        with self._lock:
+            status = self.status(job_id)
+            if status and status["state"] in ACTIVE_STATES:
+                return job_id
+            if status and status["state"] != "interrupted" and not restart:
+                return job_id
+
+            job_dir = self.job_dir(job_id)
+            shutil.rmtree(job_dir, ignore_errors=True)
+            os.makedirs(job_dir)
+            write_status(job_dir, "queued", "Waiting for compute")
+            ticket = self.scheduler.request(cpus, label=job_id)
+            self._tickets[job_id] = ticket
+            threading.Thread(
+                target=self._dispatch, args=(job_id, ticket, fn, args, kwargs), daemon=True
+            ).start()
+            self._prune()
+        return job_id
+
+    def _dispatch(self, job_id, ticket, fn, args, kwargs):
+        """Hands the job to the process pool once the scheduler grants its CPUs"""
+        if not self.scheduler.wait(ticket):
+            return
+        kwargs = dict(kwargs, n_cpus=ticket.cpus)
+        try:
+            future = self._submit(_execute, self.job_dir(job_id), fn, args, kwargs)
+        except Exception as e:
+            self._failed(job_id, ticket, f"{type(e).__name__}: {e}")
+            return
+        future.add_done_callback(lambda done: self._finished(job_id, ticket, done))
+
+    def _submit(self, *args):
+        """Submits to the process pool, replacing it first if a crashed worker has broken it"""
+        with self._pool_lock:
+            try:
+                return self._executor.submit(*args)
+            except BrokenProcessPool:
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                return self._executor.submit(*args)
+
+    def _finished(self, job_id, ticket, future):
+        if future.exception() is not None:
+            # The worker process died (e.g. out of memory) before it could record the outcome
+            self._failed(job_id, ticket, str(future.exception()))
+            return
+        self.scheduler.release(ticket)
+        self._tickets.pop(job_id, None)
+
+    def _failed(self, job_id, ticket, error):
+        write_status(self.job_dir(job_id), "failed", "Failed", error=error)
+        self.scheduler.release(ticket)
+        self._tickets.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Cancels a queued job at once, or a running one at its next progress report"""
+        job_dir = self.job_dir(job_id)
+        ticket = self._tickets.get(job_id)
+        if ticket is not None and self.scheduler.withdraw(ticket):
+            self._tickets.pop(job_id, None)
+            write_status(job_dir, "cancelled", "Cancelled")
+            return
+        if os.path.isdir(job_dir):
+            open(os.path.join(job_dir, "cancel"), "w").close()
+
+    def result(self, job_id):
+        with open(os.path.join(self.job_dir(job_id), "result.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def _prune(self):
+        """Keeps the most recent finished jobs within the history limit"""
+        finished = []
+        for entry in os.scandir(self.root):
+            status = read_status(entry.path) if entry.is_dir() else None
+            if status and status["state"] not in ACTIVE_STATES:
+                finished.append((status["updated"], entry.path))
+        for _, path in sorted(finished, reverse=True)[self.history:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@st.cache_resource
+def get_job_runner():
+    """One job runner shared by every session of the server"""
+    return JobRunner(get_scheduler())
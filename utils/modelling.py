@@ -0,0 +1,239 @@
+import multiprocessing
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from imblearn.combine import SMOTEENN, SMOTETomek
+from imblearn.over_sampling import (
+    ADASYN, SMOTEN, SVMSMOTE, BorderlineSMOTE, KMeansSMOTE, RandomOverSampler
+)
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score
+from sklearn.preprocessing import LabelEncoder
+import streamlit as st
+from threadpoolctl import threadpool_limits
+
+from utils.resample_cache import cached_fit_resample
+from utils.scheduler import compute_slot
+from utils.search import SEARCH_STRATEGIES, budgeted_search, grid_scores, search_candidates
+
+SAMPLERS = {
+    'RandomOverSampler': RandomOverSampler,
+    'SVMSMOTE': SVMSMOTE,
+    'SMOTEENN': SMOTEENN,
+    'SMOTETomek': SMOTETomek,
+    'ADASYN': ADASYN,
+    'BorderlineSMOTE': BorderlineSMOTE,
+    'KMeansSMOTE': KMeansSMOTE,
+    'SMOTEN': SMOTEN,
+}
+
+RESULT_COLUMNS = [
+    'Balancing Method', 'Train Accuracy', 'Test Accuracy', 'Test F1 Score',
+    'Test Precision', 'Test Recall', 'Train Classification Report', 'Test Classification Report'
+]
+
+# Train/test split and progress queue handed to each pool worker once, instead of with every task
+_worker_data = {}
+
+
+def make_sampler(method_name, sampling_strategy, random_state):
+    """imblearn sampler for a balancing method name; None means no balancing"""
+    if method_name == "No Balancing":
+        return None
+    return SAMPLERS[method_name](random_state=random_state, sampling_strategy=sampling_strategy)
+
+
+def evaluate_method(method_name, data, n_jobs, model, search_model, param_grid, tune,
+                    sampling_strategy, random_state, search_options=None, search_strategy="Exhaustive grid",
+                    n_iter=20, time_budget=None, score_candidates=grid_scores, report=None):
+    """Resamples, fits (optionally after a hyperparameter search), and scores one balancing method
+
+    Returns a results_df row, the best hyperparameters and search summary (None without
+    tuning) and the time taken. score_candidates is the search's CV engine (see budgeted_search);
+    report receives the search's best-so-far updates.
+    """
+    started = time.perf_counter()
+    X_train, X_test, y_train, y_test = data
+    sampler = make_sampler(method_name, sampling_strategy, random_state)
+    if sampler is None:
+        X_train_resampled, y_train_resampled = X_train, y_train
+    else:
+        X_train_resampled, y_train_resampled = cached_fit_resample(
+            sampler, method_name, X_train, y_train, sampling_strategy, random_state
+        )
+
+    # Encode labels
+    label_encoder = LabelEncoder()
+    y_train_encoded = label_encoder.fit_transform(y_train_resampled)
+    y_test_encoded = label_encoder.transform(y_test)
+
+    # Train model
+    best_params, search = None, None
+    if tune:
+        candidates = search_candidates(search_strategy, param_grid, n_iter, random_state)
+        best_params, best_score, n_evaluated, stopped = budgeted_search(
+            clone(search_model), candidates, X_train_resampled, y_train_encoded, search_strategy,
+            n_jobs=n_jobs, budget=time_budget, report=report, random_state=random_state,
+            search_options=search_options, score_candidates=score_candidates
+        )
+        fitted = clone(search_model).set_params(**best_params).fit(X_train_resampled, y_train_encoded)
+        search = {
+            "best_score": best_score,
+            "evaluated": n_evaluated,
+            "candidates": len(candidates),
+            "stopped": stopped,
+        }
+    else:
+        fitted = clone(model).fit(X_train_resampled, y_train_encoded)
+
+    # Evaluate model
+    y_pred_train = fitted.predict(X_train_resampled)
+    y_pred_test = fitted.predict(X_test)
+
+    row = {
+        'Balancing Method': method_name,
+        'Train Accuracy': accuracy_score(y_train_encoded, y_pred_train),
+        'Test Accuracy': accuracy_score(y_test_encoded, y_pred_test),
+        'Test F1 Score': f1_score(y_test_encoded, y_pred_test, average='weighted'),
+        'Test Precision': precision_score(y_test_encoded, y_pred_test, average='weighted'),
+        'Test Recall': recall_score(y_test_encoded, y_pred_test, average='weighted'),
+        'Train Classification Report': classification_report(
+            y_train_encoded, y_pred_train, target_names=label_encoder.classes_
+        ),
+        'Test Classification Report': classification_report(
+            y_test_encoded, y_pred_test, target_names=label_encoder.classes_
+        ),
+    }
+    return {
+        "row": row,
+        "best_params": best_params,
+        "search": search,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def _init_worker(data, progress):
+    _worker_data["data"] = data
+    _worker_data["progress"] = progress
+
+
+def _guarded(task, method_name, data, n_jobs, report=None):
+    """Runs a task, turning a failure into an error entry so other methods still report"""
+    try:
+        return task(method_name, data, n_jobs, report=report)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _run_in_worker(task, method_name, n_jobs):
+    progress = _worker_data["progress"]
+    # Thread limits are process wide, so they are only ever set in the comparison's own workers
+    with threadpool_limits(limits=n_jobs):
+        return _guarded(
+            task, method_name, _worker_data["data"], n_jobs, lambda info: progress.put((method_name, info))
+        )
+
+
+def _drain(progress, on_progress):
+    while True:
+        try:
+            method_name, info = progress.get_nowait()
+        except queue.Empty:
+            return
+        if on_progress:
+            on_progress(method_name, info)
+
+
+def _stop_pool(pool):
+    """Drops queued tasks and kills running workers, returning once they have exited"""
+    # ProcessPoolExecutor only gained terminate_workers() in Python 3.14
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def compare_methods(method_names, task, data, label, on_progress=None):
+    """Runs task (see evaluate_method) for every balancing method and yields results as they finish
+
+    The methods share one CPU budget from the compute scheduler: they run as independent
+    processes, each with an equal share of the budget for its own BLAS and CV parallelism.
+    Even a single method runs in a worker process, so its BLAS limit never touches the server.
+    on_progress(method_name, info) is called on the calling thread with search updates.
+    """
+    if not method_names:
+        return
+    with compute_slot(label) as n_jobs:
+        workers = min(len(method_names), n_jobs)
+        per_task = max(1, n_jobs // workers)
+        context = multiprocessing.get_context("spawn")
+        progress = context.Queue()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(data, progress),
+        )
+        pending = ()
+        try:
+            futures = {
+                pool.submit(_run_in_worker, task, method_name, per_task): method_name
+                for method_name in method_names
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                _drain(progress, on_progress)
+                for future in done:
+                    yield futures[future], future.result()
+        finally:
+            if pending:
+                # A rerun closed this generator mid-comparison; stop its workers before the slot's CPUs are released
+                _stop_pool(pool)
+            else:
+                pool.shutdown()
+
+
+def search_controls():
+    """Search strategy, randomized candidate count and per-method time budget widgets"""
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        strategy = st.selectbox(
+            "Search Strategy",
+            SEARCH_STRATEGIES,
+            help="Successive halving scores every setting on a small subsample and keeps the best third on 3x more data"
+        )
+    with col_b:
+        n_iter = st.number_input(
+            "Randomized Candidates", min_value=1, max_value=500, value=20, disabled=strategy != "Randomized"
+        )
+    with col_c:
+        budget = st.number_input("Time Budget per Method (s, 0 = unlimited)", min_value=0, value=300, step=30)
+    return {"search_strategy": strategy, "n_iter": int(n_iter), "time_budget": budget or None}
+
+
+def search_progress():
+    """on_progress callback showing each method's best-so-far search result in its own slot"""
+    slots = {}
+
+    def show(method_name, info):
+        slots.setdefault(method_name, st.empty()).info(
+            f"{method_name}: best CV accuracy so far {info['best_score']:.4f} after {info['evaluated']} "
+            f"evaluations (round {info['round']}, {info['elapsed']:.0f} s) with {info['best_params']}"
+        )
+    return show
+
+
+def show_search_outcome(method_name, outcome):
+    """Best hyperparameters and how much of the search ran"""
+    if outcome["best_params"] is None:
+        return
+    search = outcome["search"]
+    st.write(f"Best Hyperparameters ({method_name}):", outcome["best_params"])
+    st.caption(
+        f"CV accuracy {search['best_score']:.4f} from {search['evaluated']} evaluations of "
+        f"{search['candidates']} candidates" + (" (stopped at the time budget)" if search["stopped"] else "")
+    )
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from utils.search import EngineCache, content_key, grid_scores
+
+# Per-fold class statistics by content of the matrix being searched, shared by its chunks
+_stats_cache = EngineCache()
+
+
+def fold_statistics(X_train, y_train):
+    """What GaussianNB learns from a fold before smoothing"""
+    classes = np.unique(y_train)
+    means = np.stack([X_train[y_train == c].mean(axis=0) for c in classes])
+    variances = np.stack([X_train[y_train == c].var(axis=0) for c in classes])
+    counts = np.array([(y_train == c).sum() for c in classes])
+    return {
+        "classes": classes,
+        "log_prior": np.log(counts / counts.sum()),
+        "means": means,
+        "variances": variances,
+        "max_variance": X_train.var(axis=0).max(),
+    }
+
+
+def smoothing_log_likelihood(stats, X_test, var_smoothing):
+    """GaussianNB joint log-likelihood of the test rows for every smoothing value at once
+
+    Returns an array of shape (test rows, classes, smoothing values). Adding epsilon only
+    changes the variances, so each class's sums over genes are two matrix products with
+    the inverse and log of the smoothed variances.
+    """
+    epsilons = np.asarray(var_smoothing, dtype=np.float64) * stats["max_variance"]
+    jll = np.empty((X_test.shape[0], stats["classes"].size, epsilons.size))
+    for i, means in enumerate(stats["means"]):
+        deviations = (X_test - means) ** 2
+        smoothed = stats["variances"][i][:, None] + epsilons[None, :]
+        log_norm = -0.5 * np.log(2.0 * np.pi * smoothed).sum(axis=0)
+        jll[:, i, :] = stats["log_prior"][i] + log_norm - 0.5 * (deviations @ (1.0 / smoothed))
+    return jll
+
+
+def _fold_statistics(X, y, folds):
+    return [fold_statistics(X[train].astype(np.float64), y[train]) for train, _ in folds]
+
+
+def gaussian_nb_scores(estimator, candidates, X, y, cv, scoring, n_jobs, search_options=None):
+    """Mean CV accuracy of GaussianNB var_smoothing values from one set of statistics per fold
+
+    Drop-in score_candidates for budgeted_search. Class means, variances and priors are
+    computed once per fold and every var_smoothing value is scored in one vectorized pass.
+    Other scorers, fixed priors or grids over other parameters fall back to GridSearchCV.
+    """
+    if (scoring != "accuracy" or estimator.get_params().get("priors") is not None
+            or any(set(params) != {"var_smoothing"} for params in candidates)):
+        return grid_scores(estimator, candidates, X, y, cv, scoring, n_jobs, search_options)
+
+    var_smoothing = np.array([params["var_smoothing"] for params in candidates], dtype=np.float64)
+    X = np.asarray(X)
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=cv).split(np.zeros(len(y)), y))
+    fold_stats = _stats_cache.get(content_key(X, y, cv), lambda: _fold_statistics(X, y, folds))
+
+    def score_fold(fold):
+        stats, (_, test) = fold_stats[fold], folds[fold]
+        jll = smoothing_log_likelihood(stats, X[test].astype(np.float64), var_smoothing)
+        return (stats["classes"][jll.argmax(axis=1)] == y[test][:, None]).mean(axis=0)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(n_jobs, len(folds)))) as pool:
+        scores = list(pool.map(score_fold, range(len(folds))))
+    return np.mean(scores, axis=0)
+
+
+# budgeted_search hands the engine each round's full grid instead of chunks that each rescore the folds
+gaussian_nb_scores.whole_sweep = True
@@ -0,0 +1,107 @@
+import numpy as np
+import plotly.graph_objects as go
+
+GRID_BINS = 200
+
+
+def decimate(x, y, bins=GRID_BINS):
+    """Indices of one representative point per occupied cell of a bins x bins grid
+
+    Keeps the outline and the outliers of dense point clouds at a bounded point count.
+    """
+    rows = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if rows.size <= bins:
+        return rows
+    cells = np.zeros(rows.size, dtype=np.int64)
+    for values in (x[rows], y[rows]):
+        span = np.ptp(values) or 1.0
+        cells = cells * bins + ((values - values.min()) / span * (bins - 1)).astype(np.int64)
+    _, first = np.unique(cells, return_index=True)
+    return rows[np.sort(first)]
+
+
+def gene_scatter(x, y, genes, highlighted, x_title, y_title):
+    """WebGL scatter with highlighted genes drawn exactly and the rest binned
+
+    Returns the figure and the gene IDs of each trace, to map selections back to genes.
+    """
+    finite = np.isfinite(x) & np.isfinite(y)
+    background = np.flatnonzero(~highlighted & finite)
+    background = background[decimate(x[background], y[background])]
+    foreground = np.flatnonzero(highlighted & finite)
+
+    fig = go.Figure()
+    trace_genes = []
+    for rows, name, color in (
+        (background, "Other genes (binned)", "rgba(160, 160, 160, 0.5)"),
+        (foreground, "Filtered genes", "crimson"),
+    ):
+        fig.add_trace(go.Scattergl(
+            x=x[rows],
+            y=y[rows],
+            mode="markers",
+            name=f"{name} ({rows.size:,})",
+            marker=dict(color=color, size=5),
+            customdata=genes[rows],
+            hovertemplate=f"%{{customdata}}<br>{x_title}: %{{x:.3f}}<br>{y_title}: %{{y:.3f}}<extra></extra>",
+        ))
+        trace_genes.append(genes[rows])
+
+    fig.update_layout(
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        dragmode="lasso",
+        height=450,
+        margin=dict(l=10, r=10, t=30, b=10),
+        legend=dict(orientation="h", y=1.08),
+    )
+    return fig, trace_genes
+
+
+def volcano_plot(results, highlighted):
+    """log2 fold change against -log10 adjusted p-value"""
+    padj = results["padj"].to_numpy(dtype=np.float64)
+    positive = padj[padj > 0]
+    floor = positive.min() if positive.size else 1e-300
+    y = -np.log10(np.where(padj == 0, floor, padj))
+    x = results["log2FoldChange"].to_numpy(dtype=np.float64)
+    return gene_scatter(x, y, results.index.to_numpy(), highlighted, "log2 fold change", "-log10 padj")
+
+
+def ma_plot(results, highlighted):
+    """Mean expression (log10 baseMean) against log2 fold change"""
+    with np.errstate(divide="ignore"):
+        x = np.log10(results["baseMean"].to_numpy(dtype=np.float64))
+    y = results["log2FoldChange"].to_numpy(dtype=np.float64)
+    return gene_scatter(x, y, results.index.to_numpy(), highlighted, "log10 baseMean", "log2 fold change")
+
+
+def selected_genes(event, trace_genes):
+    """Gene IDs of the points in a Streamlit plotly selection event"""
+    points = event.selection.points if event else []
+    return [trace_genes[point["curve_number"]][point["point_index"]] for point in points]
+
+
+def roc_figure(curves, names, title):
+    """One line per gene ROC curve plus the chance diagonal, legend entries named by names"""
+    fig = go.Figure()
+    for (fpr, tpr), name in zip(curves, names):
+        fig.add_trace(go.Scatter(
+            x=fpr,
+            y=tpr,
+            mode="lines",
+            name=name,
+            hovertemplate=f"{name}<br>FPR: %{{x:.3f}}<br>TPR: %{{y:.3f}}<extra></extra>",
+        ))
+    fig.add_trace(go.Scatter(
+        x=[0, 1], y=[0, 1], mode="lines", name="Chance",
+        line=dict(color="black", dash="dash"), hoverinfo="skip",
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title="False Positive Rate", range=[0.0, 1.0]),
+        yaxis=dict(title="True Positive Rate", range=[0.0, 1.05]),
+        height=600,
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+    return fig
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+BLOCK_GENES = 2048
+INTEGER_DTYPES = (np.int16, np.int32, np.int64)
+
+
+def narrowest_int_dtype(low, high):
+    """Smallest signed integer dtype holding every value in [low, high]"""
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    raise OverflowError(f"Counts between {low} and {high} do not fit in int64")
+
+
+def _rounded(block, in_place=False):
+    """Block rounded to whole counts with NaN as 0; rounds in place when the block is a copy"""
+    if block.dtype.kind in "iu":
+        return block
+    block = np.round(block, out=block if in_place else None)
+    np.nan_to_num(block, copy=False, nan=0.0)
+    return block
+
+
+def preprocess_counts(counts, drop_empty=True, block_size=BLOCK_GENES):
+    """Genes x samples counts to a rounded integer samples x genes frame in one pass
+
+    Replaces the fillna(0) / round() / astype / row-sum filter / .T chain: gene blocks are
+    rounded and written straight into a single preallocated samples x genes array of the
+    narrowest safe integer dtype, so peak memory stays close to the final matrix size.
+    """
+    values = counts.to_numpy()
+    n_genes = values.shape[0]
+    # Small blocks on small matrices keep the temporaries a minor fraction of the output
+    block_size = max(64, min(block_size, n_genes // 32))
+
+    # First pass: which genes to keep and the value range they need
+    keep = np.ones(n_genes, dtype=bool)
+    low, high = 0, 0
+    for start in range(0, n_genes, block_size):
+        block = _rounded(values[start:start + block_size])
+        block_keep = keep[start:start + block_size]
+        if drop_empty:
+            block_keep[:] = block.sum(axis=1) > 0
+        if block_keep.any() and block.shape[1]:
+            low = min(low, block.min(axis=1)[block_keep].min())
+            high = max(high, block.max(axis=1)[block_keep].max())
+    dtype = narrowest_int_dtype(low, high)
+
+    # Second pass: fill the transposed output block by block
+    kept_rows = np.flatnonzero(keep)
+    out = np.empty((values.shape[1], kept_rows.size), dtype=dtype)
+    for start in range(0, kept_rows.size, block_size):
+        rows = kept_rows[start:start + block_size]
+        out[:, start:start + rows.size] = _rounded(values[rows], in_place=True).T
+
+    return pd.DataFrame(out, index=counts.columns, columns=counts.index[kept_rows], copy=False)
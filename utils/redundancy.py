@@ -0,0 +1,57 @@
+import numpy as np
+
+BLOCK_GENES = 512
+
+
+def standardized(X):
+    """log1p expression z-scored per gene column, so X.T @ X / n is the Pearson correlation"""
+    Z = np.log1p(np.asarray(X, dtype=np.float64))
+    Z -= Z.mean(axis=0)
+    std = Z.std(axis=0)
+    # Constant genes correlate with nothing
+    np.divide(Z, std, out=Z, where=std > 0)
+    Z[:, std == 0] = 0.0
+    return Z
+
+
+def prune_redundant(X, relevance, threshold=0.8, block_size=BLOCK_GENES):
+    """Greedy max-relevance / min-redundancy selection over samples x genes expression
+
+    Genes are visited in decreasing relevance and kept unless their absolute correlation with
+    an already kept gene reaches threshold; dropped genes join the cluster of the kept gene
+    they correlate with most. Correlations come from BLAS products of one candidate block
+    against the kept genes, so memory stays at block_size x kept.
+
+    Returns the kept columns (best first) and each column's representative column.
+    """
+    Z = standardized(X)
+    n_samples, n_genes = Z.shape
+    relevance = np.nan_to_num(np.asarray(relevance, dtype=np.float64), nan=-np.inf)
+    order = np.argsort(-relevance, kind="stable")
+    representative = np.arange(n_genes)
+    kept = np.empty(0, dtype=np.int64)
+
+    for start in range(0, n_genes, block_size):
+        columns = order[start:start + block_size]
+        block = Z[:, columns]
+        candidates = np.ones(columns.size, dtype=bool)
+        if kept.size:
+            corr = np.abs(block.T @ Z[:, kept]) / n_samples
+            best = corr.argmax(axis=1)
+            covered = corr[np.arange(columns.size), best] >= threshold
+            representative[columns[covered]] = kept[best[covered]]
+            candidates = ~covered
+
+        # Resolve the rest of the block against itself, still in relevance order
+        within = np.abs(block.T @ block) / n_samples
+        block_kept = []
+        for j in np.flatnonzero(candidates):
+            if block_kept:
+                closest = np.argmax(within[j, block_kept])
+                if within[j, block_kept[closest]] >= threshold:
+                    representative[columns[j]] = columns[block_kept[closest]]
+                    continue
+            block_kept.append(j)
+        kept = np.concatenate([kept, columns[block_kept]])
+
+    return kept, representative
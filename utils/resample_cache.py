@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+
+import imblearn
+import numpy as np
+
+from utils.counts_cache import compact_values
+
+CACHE_DIR = os.environ.get("RESAMPLE_CACHE_DIR", os.path.join("temp", "resampled"))
+MAX_BYTES = int(float(os.environ.get("RESAMPLE_CACHE_MAX_GB", "2")) * 1024 ** 3)
+HASH_ROWS = 256
+
+
+def resample_key(X, y, method_name, sampling_strategy, random_state):
+    """Digest of the training split and the sampler settings that determine fit_resample's output"""
+    hasher = hashlib.blake2b(digest_size=20)
+    X = np.asarray(X)
+    hasher.update(f"{X.shape}|{X.dtype.str}|{method_name}|{sampling_strategy!r}|{random_state!r}|".encode())
+    hasher.update(imblearn.__version__.encode())
+    for start in range(0, X.shape[0], HASH_ROWS):
+        hasher.update(np.ascontiguousarray(X[start:start + HASH_ROWS]).data)
+    hasher.update(np.asarray(y).astype(str).tobytes())
+    return hasher.hexdigest()
+
+
+def _row_sources(X, X_resampled):
+    """Index of the training row each resampled row copies, -1 for synthetic rows"""
+    X = np.ascontiguousarray(X, dtype=X_resampled.dtype)
+    rows = {row.tobytes(): i for i, row in enumerate(X)}
+    sources = np.full(X_resampled.shape[0], -1, dtype=np.int64)
+    for i, row in enumerate(np.ascontiguousarray(X_resampled)):
+        sources[i] = rows.get(row.tobytes(), -1)
+    return sources
+
+
+class ResampleCache:
+    """Disk cache of fit_resample outputs shared by every page, session and worker process
+
+    Entries keep only the synthetic rows (in the narrowest exact dtype) plus, for every other
+    row, the index of the training row it copies; least recently used entries are evicted
+    once the cache exceeds max_bytes. Labels are stored as integer codes into their classes,
+    with object classes as fixed-width strings, so entries load without pickle.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key, X):
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                sources, synthetic = stored["sources"], stored["synthetic"]
+                classes = stored["y_classes"].astype(np.dtype(str(stored["y_dtype"])))
+                y = classes[stored["y_codes"]]
+                dtype = np.dtype(str(stored["dtype"]))
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            return None
+        os.utime(path)
+
+        X_resampled = np.empty((sources.size, X.shape[1]), dtype=dtype)
+        copied = sources >= 0
+        X_resampled[copied] = X[sources[copied]]
+        X_resampled[~copied] = synthetic
+        return X_resampled, y
+
+    def put(self, key, X, X_resampled, y_resampled):
+        X_resampled = np.asarray(X_resampled)
+        y_resampled = np.asarray(y_resampled)
+        sources = _row_sources(np.asarray(X), X_resampled)
+        classes, codes = np.unique(y_resampled, return_inverse=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                sources=sources,
+                synthetic=compact_values(X_resampled[sources < 0]),
+                y_codes=compact_values(codes.ravel()),
+                y_classes=classes.astype(str) if classes.dtype == object else classes,
+                y_dtype=np.array(y_resampled.dtype.str),
+                dtype=np.array(X_resampled.dtype.str),
+            )
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def cached_fit_resample(sampler, method_name, X, y, sampling_strategy, random_state, cache=None):
+    """sampler.fit_resample(X, y), reused across reruns and pages with the same split and settings"""
+    cache = cache or ResampleCache()
+    key = resample_key(X, y, method_name, sampling_strategy, random_state)
+    cached = cache.get(key, np.asarray(X))
+    if cached is not None:
+        return cached
+    X_resampled, y_resampled = sampler.fit_resample(X, y)
+    cache.put(key, X, X_resampled, y_resampled)
+    return X_resampled, y_resampled
@@ -0,0 +1,308 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.stats import false_discovery_control, rankdata
+from sklearn.metrics import roc_curve
+
+RESAMPLE_BLOCK = 512
+
+
+def gene_auc(X, y_bin, block_size=2048):
+    """ROC AUC of every gene column at once via the Mann-Whitney U statistic"""
+    X = np.asarray(X)
+    y_bin = np.asarray(y_bin).ravel().astype(bool)
+    n_pos = int(y_bin.sum())
+    n_neg = y_bin.size - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return np.full(X.shape[1], np.nan)
+
+    auc_values = np.empty(X.shape[1], dtype=np.float64)
+    for start in range(0, X.shape[1], block_size):
+        stop = start + block_size
+        ranks = rankdata(X[:, start:stop], axis=0)
+        rank_sum = ranks[y_bin].sum(axis=0)
+        auc_values[start:stop] = (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+    return auc_values
+
+
+def cutoff_table(X, y_bin, specificities=(0.90, 0.95), block_size=2048):
+    """Youden-optimal cutoff and sensitivity at fixed specificities for every gene column
+
+    One descending argsort per column gives the cumulative true and false positives at every
+    distinct threshold (the last row of each tie group), as roc_curve would for x >= cutoff.
+    """
+    X = np.asarray(X)
+    y_bin = np.asarray(y_bin).ravel().astype(bool)
+    n_pos = int(y_bin.sum())
+    n_neg = y_bin.size - n_pos
+    n_genes = X.shape[1]
+    table = {"Youden_J": np.full(n_genes, np.nan), "Youden_Cutoff": np.full(n_genes, np.nan)}
+    for specificity in specificities:
+        table[f"Sensitivity@{specificity:.0%}Spec"] = np.full(n_genes, np.nan)
+    if n_pos == 0 or n_neg == 0 or X.shape[0] == 0:
+        return table
+
+    for start in range(0, n_genes, block_size):
+        stop = min(start + block_size, n_genes)
+        block = X[:, start:stop]
+        order = np.argsort(-block, axis=0, kind="stable")
+        ordered = np.take_along_axis(block, order, axis=0)
+        positive = y_bin[order]
+        tpr = np.cumsum(positive, axis=0) / n_pos
+        fpr = np.cumsum(~positive, axis=0) / n_neg
+        distinct = np.ones(ordered.shape, dtype=bool)
+        distinct[:-1] = ordered[:-1] != ordered[1:]
+
+        youden = np.where(distinct, tpr - fpr, -np.inf)
+        best = np.argmax(youden, axis=0)
+        columns = np.arange(stop - start)
+        table["Youden_J"][start:stop] = youden[best, columns]
+        table["Youden_Cutoff"][start:stop] = ordered[best, columns]
+        for specificity in specificities:
+            allowed = distinct & (fpr <= 1 - specificity + 1e-12)
+            table[f"Sensitivity@{specificity:.0%}Spec"][start:stop] = np.where(allowed, tpr, 0.0).max(axis=0)
+    return table
+
+
+def gene_roc_curves(X, y_bin, columns, drop_intermediate=False):
+    """ROC curves for the selected gene columns only
+
+    drop_intermediate keeps only the key thresholds, the corners where the curve turns.
+    """
+    X = np.asarray(X)
+    y_bin = np.asarray(y_bin).ravel()
+    curves = {}
+    for i in columns:
+        fpr, tpr, _ = roc_curve(y_bin, X[:, i], drop_intermediate=drop_intermediate)
+        curves[i] = (fpr, tpr)
+    return curves
+
+
+def convex_hull(fpr, tpr):
+    """Vertices of the ROC convex hull: the upper hull of the curve from (0, 0) to (1, 1)"""
+    hull = []
+    for point in zip(fpr, tpr):
+        # Pop the last vertex while it lies on or below the chord to the new point
+        while len(hull) >= 2:
+            (x1, y1), (x2, y2) = hull[-2], hull[-1]
+            if (x2 - x1) * (point[1] - y1) - (y2 - y1) * (point[0] - x1) < 0:
+                break
+            hull.pop()
+        hull.append(point)
+    hull = np.asarray(hull, dtype=np.float64)
+    return hull[:, 0], hull[:, 1]
+
+
+def top_genes(roc_auc, threshold, top_k, gene_ids=None, search=""):
+    """Columns above the AUC threshold, best first, optionally matching a gene ID substring"""
+    with np.errstate(invalid="ignore"):
+        columns = np.flatnonzero(roc_auc > threshold)
+    if search:
+        needle = search.lower()
+        columns = columns[np.array([needle in str(gene_ids[i]).lower() for i in columns], dtype=bool)]
+    order = np.argsort(-roc_auc[columns], kind="stable")
+    return columns[order[:top_k]]
+
+
+def _class_split(y_bin):
+    y_bin = np.asarray(y_bin).ravel().astype(bool)
+    return y_bin, int(y_bin.sum()), int((~y_bin).sum())
+
+
+def bootstrap_weights(y_bin, n_boot, rng):
+    """Per-replicate sample multiplicities of a class-stratified bootstrap, drawn once for all genes"""
+    y_bin, _, _ = _class_split(y_bin)
+    weights = np.zeros((n_boot, y_bin.size), dtype=np.float64)
+    rows = np.arange(n_boot)[:, None]
+    for members in (np.flatnonzero(y_bin), np.flatnonzero(~y_bin)):
+        draws = members[rng.integers(0, members.size, size=(n_boot, members.size))]
+        np.add.at(weights, (rows, draws), 1.0)
+    return weights
+
+
+def _bootstrap_block(X, y_bin, weights):
+    """Bootstrap AUCs (replicates x genes) of one gene block from a single argsort per gene
+
+    A replicate only reweights samples, so each gene's sort order and tie groups are reused;
+    the weighted midrank of a tie group is the weight below it plus half its own weight.
+    Multiplicities are small integers, so float32 cumulative sums stay exact.
+    """
+    n, n_genes = X.shape
+    order = np.argsort(X, axis=0, kind="stable")
+    ordered = np.take_along_axis(X, order, axis=0)
+    positive = y_bin[order]
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ends = np.ones(ordered.shape, dtype=bool)
+    ends[:-1] = starts[1:]
+    positions = np.arange(n)[:, None]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(ends, positions, n - 1)[::-1], axis=0)[::-1] + 1
+    # Flat offsets into the (n + 1) x genes cumulative weights of each tie group's bounds
+    columns = np.arange(n_genes)
+    first = (first * n_genes + columns).ravel()
+    last = (last * n_genes + columns).ravel()
+
+    n_pos = weights[0, y_bin].sum()
+    n_neg = weights[0].sum() - n_pos
+    cumulative = np.zeros((n + 1, n_genes), dtype=np.float32)
+    flat = cumulative.ravel()
+    aucs = np.empty((weights.shape[0], n_genes), dtype=np.float64)
+    for b, w in enumerate(weights.astype(np.float32)):
+        w_ordered = w.take(order)
+        np.cumsum(w_ordered, axis=0, out=cumulative[1:])
+        twice_midrank = (flat.take(first) + flat.take(last)).reshape(n, n_genes) + 1
+        w_ordered *= positive
+        rank_sum = np.einsum("ij,ij->j", w_ordered, twice_midrank, dtype=np.float64) / 2
+        aucs[b] = (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+    return aucs
+
+
+def auc_significance(X, y_bin, n_boot=1000, n_perm=1000, alpha=0.05, random_state=0,
+                     n_jobs=1, block_size=RESAMPLE_BLOCK):
+    """Bootstrap confidence intervals and label-permutation p-values of every gene's AUC
+
+    Replicate resamples and permutations are drawn once and shared by every gene block; the
+    blocks run on n_jobs threads (numpy releases the GIL in the heavy array operations).
+    Permutation p-values are one-sided, for an AUC at least as high as observed.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y_bin, n_pos, n_neg = _class_split(y_bin)
+    n_genes = X.shape[1]
+    if n_pos == 0 or n_neg == 0:
+        nan = np.full(n_genes, np.nan)
+        return {"AUC_CI_low": nan, "AUC_CI_high": nan, "perm_pvalue": nan, "perm_padj": nan}
+
+    rng = np.random.default_rng(random_state)
+    weights = bootstrap_weights(y_bin, n_boot, rng)
+    # Permuted labels as a replicates x samples indicator matrix: rank sums become one matmul
+    shuffled = rng.permuted(np.tile(np.arange(y_bin.size), (n_perm, 1)), axis=1)
+    permuted = np.zeros((n_perm, y_bin.size), dtype=np.float64)
+    np.put_along_axis(permuted, shuffled[:, :n_pos], 1.0, axis=1)
+
+    def run_block(start):
+        block = X[:, start:start + block_size]
+        boot = _bootstrap_block(block, y_bin, weights)
+        ranks = rankdata(block, axis=0)
+        observed = (ranks[y_bin].sum(axis=0) - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+        perm = (permuted @ ranks - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+        exceed = (perm >= observed - 1e-12).sum(axis=0)
+        low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2], axis=0)
+        return low, high, (exceed + 1) / (n_perm + 1)
+
+    starts = range(0, n_genes, block_size)
+    with ThreadPoolExecutor(max_workers=max(1, n_jobs)) as pool:
+        parts = list(pool.map(run_block, starts))
+    low, high, pvalues = (np.concatenate(column) for column in zip(*parts))
+    return {
+        "AUC_CI_low": low,
+        "AUC_CI_high": high,
+        "perm_pvalue": pvalues,
+        "perm_padj": false_discovery_control(pvalues),
+    }
+
+
+def _flat_keys(sorted_values, values):
+    """Per-gene sorted columns and query values shifted into disjoint ranges of one flat axis
+
+    Lets a single searchsorted place every query in its own gene's column; exact for counts.
+    """
+    n_genes = sorted_values.shape[1]
+    low = min(sorted_values.min(), values.min())
+    high = max(sorted_values.max(), values.max())
+    offsets = np.arange(n_genes) * (high - low + 2) - low
+    return (sorted_values.T + offsets[:, None]).ravel(), values.T + offsets[:, None]
+
+
+def _placements(sorted_values, values):
+    """Per gene, how many stored values lie below and equal to each query value"""
+    n_stored, n_genes = sorted_values.shape
+    if n_stored == 0 or values.shape[0] == 0:
+        zeros = np.zeros(values.shape, dtype=np.int64)
+        return zeros, zeros
+    flat, queries = _flat_keys(sorted_values, values)
+    left = np.searchsorted(flat, queries, side="left")
+    right = np.searchsorted(flat, queries, side="right")
+    starts = (np.arange(n_genes) * n_stored)[:, None]
+    return (left - starts).T, (right - left).T
+
+
+def _merge_sorted(sorted_values, values):
+    """Per-gene sorted columns with the query values inserted, a full O(stored x genes) copy"""
+    n_stored, n_genes = sorted_values.shape
+    values = np.sort(values, axis=0)
+    if n_stored == 0 or values.shape[0] == 0:
+        return np.concatenate([sorted_values, values]) if n_stored else values
+    flat, queries = _flat_keys(sorted_values, values)
+    positions = np.searchsorted(flat, queries, side="left")
+    merged = np.insert(sorted_values.T.ravel(), positions.ravel(), values.T.ravel())
+    return merged.reshape(n_genes, n_stored + values.shape[0]).T
+
+
+class AucState:
+    """Per-gene sufficient statistics of the AUC: each class's values sorted per gene and U
+
+    U counts the (positive, negative) sample pairs where the positive is higher, ties as one
+    half, so AUC = U / (n_pos * n_neg) and appending samples only needs their placements
+    among the stored values of the other class.
+    """
+
+    def __init__(self, genes, positive, negative, u):
+        self.genes = np.asarray(genes).astype(str)
+        self.positive = positive
+        self.negative = negative
+        self.u = u
+
+    @classmethod
+    def from_matrix(cls, X, y_bin, genes):
+        X = np.asarray(X, dtype=np.float64)
+        y_bin = np.asarray(y_bin).ravel().astype(bool)
+        empty = np.empty((0, X.shape[1]))
+        state = cls(genes, empty, empty, np.zeros(X.shape[1]))
+        return state.appended(X, y_bin)
+
+    @property
+    def n_pos(self):
+        return self.positive.shape[0]
+
+    @property
+    def n_neg(self):
+        return self.negative.shape[0]
+
+    def auc(self):
+        if self.n_pos == 0 or self.n_neg == 0:
+            return np.full(self.u.shape, np.nan)
+        return self.u / (self.n_pos * self.n_neg)
+
+    def appended(self, X_new, y_new):
+        """New state with extra samples
+
+        Scoring the new samples costs O(new samples x genes x log stored), but merging them into
+        the sorted columns copies every stored value, so each append is O(stored x genes) overall.
+        """
+        X_new = np.asarray(X_new, dtype=np.float64)
+        y_new = np.asarray(y_new).ravel().astype(bool)
+        new_positive, new_negative = X_new[y_new], X_new[~y_new]
+        u = self.u.copy()
+
+        # New negatives against the stored positives, then new positives against all negatives
+        below, equal = _placements(self.positive, new_negative)
+        u += (self.n_pos - below - equal / 2).sum(axis=0)
+        negative = _merge_sorted(self.negative, new_negative)
+        below, equal = _placements(negative, new_positive)
+        u += (below + equal / 2).sum(axis=0)
+        positive = _merge_sorted(self.positive, new_positive)
+        return AucState(self.genes, positive, negative, u)
+
+    def save(self, path):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, genes=self.genes, positive=self.positive, negative=self.negative, u=self.u)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as stored:
+            return cls(stored["genes"], stored["positive"], stored["negative"], stored["u"])
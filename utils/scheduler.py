@@ -0,0 +1,103 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+
+COMPUTE_CPUS = int(os.environ.get("COMPUTE_CPUS", os.cpu_count() or 1))
+CPUS_PER_JOB = int(os.environ.get("COMPUTE_CPUS_PER_JOB", max(1, COMPUTE_CPUS // 2)))
+
+
+class Ticket:
+    """A heavy job's place in the compute queue and, once granted, its CPU budget"""
+
+    def __init__(self, cpus, label):
+        self.cpus = cpus
+        self.label = label
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+
+class ComputeScheduler:
+    """First-come first-served CPU admission control shared by every session of the server"""
+
+    def __init__(self, total_cpus=COMPUTE_CPUS):
+        self.total_cpus = total_cpus
+        self._free = total_cpus
+        self._queue = []
+        self._lock = threading.Lock()
+
+    def request(self, cpus, label=""):
+        """Queues a job asking for cpus cores (clamped to the machine) and returns its ticket"""
+        ticket = Ticket(max(1, min(cpus, self.total_cpus)), label)
+        with self._lock:
+            self._queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _dispatch(self):
+        # Strict FIFO so large jobs are not starved by a stream of small ones
+        while self._queue and self._queue[0].cpus <= self._free:
+            ticket = self._queue.pop(0)
+            self._free -= ticket.cpus
+            ticket.granted = True
+            ticket.event.set()
+
+    def wait(self, ticket, timeout=None):
+        """Blocks until the ticket is granted (True), cancelled or the timeout expires (False)"""
+        ticket.event.wait(timeout)
+        return ticket.granted
+
+    def position(self, ticket):
+        """1-based queue position, 0 once the ticket holds its CPUs"""
+        with self._lock:
+            return self._queue.index(ticket) + 1 if ticket in self._queue else 0
+
+    def withdraw(self, ticket):
+        """Removes a ticket that is still queued; False if it has already been granted"""
+        with self._lock:
+            if ticket not in self._queue:
+                return False
+            self._queue.remove(ticket)
+            ticket.cancelled = True
+            ticket.event.set()
+            self._dispatch()
+            return True
+
+    def release(self, ticket):
+        """Returns a granted ticket's CPUs, or withdraws a ticket that is still queued"""
+        with self._lock:
+            if ticket.granted:
+                ticket.granted = False
+                self._free += ticket.cpus
+                self._dispatch()
+                return
+        self.withdraw(ticket)
+
+
+@st.cache_resource
+def get_scheduler():
+    """One scheduler shared by every page and session of the server"""
+    return ComputeScheduler()
+
+
+@contextmanager
+def compute_slot(label, cpus=CPUS_PER_JOB):
+    """Waits for a CPU budget, showing the queue position, and yields the n_jobs to use
+
+    The budget is only honoured by code that is handed n_jobs; BLAS/OpenMP limits are process
+    wide, so they are set in worker processes (see JobRunner and compare_methods), never here.
+    """
+    scheduler = get_scheduler()
+    ticket = scheduler.request(cpus, label)
+    placeholder = st.empty()
+    try:
+        while not scheduler.wait(ticket, timeout=1.0):
+            placeholder.info(
+                f"⏳ {label} is waiting for compute: position {scheduler.position(ticket)} in the queue"
+            )
+        placeholder.empty()
+        yield ticket.cpus
+    finally:
+        scheduler.release(ticket)
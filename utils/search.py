@@ -0,0 +1,169 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.model_selection import GridSearchCV, ParameterGrid, ParameterSampler, train_test_split
+
+SEARCH_STRATEGIES = ["Exhaustive grid", "Randomized", "Successive halving"]
+HALVING_FACTOR = 3
+ENGINE_CACHE_BYTES = 256 * 1024 ** 2
+
+
+def search_candidates(strategy, param_grid, n_iter=20, random_state=0):
+    """Hyperparameter settings a strategy will try: the full grid or a random subset of it"""
+    grid = list(ParameterGrid(param_grid))
+    if strategy == "Randomized" and n_iter < len(grid):
+        return list(ParameterSampler(param_grid, n_iter=n_iter, random_state=random_state))
+    return grid
+
+
+def content_key(*parts):
+    """Digest of arrays (by shape, dtype and bytes) and plain settings, for caching across calls"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            if part.dtype == object:
+                part = part.astype(str)
+            hasher.update(f"{part.shape}|{part.dtype.str}|".encode())
+            hasher.update(np.ascontiguousarray(part).data)
+        else:
+            hasher.update(f"{part!r}|".encode())
+    return hasher.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+
+class EngineCache:
+    """Thread-safe LRU of what a scoring engine precomputes per training matrix, bounded in bytes
+
+    A search scores one matrix chunk after chunk, so keying by content lets every chunk reuse
+    the first one's work while sessions searching different data keep their own entries.
+    """
+
+    def __init__(self, max_bytes=ENGINE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        value = compute()
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            self._entries[key] = (value, size)
+            total = sum(entry_size for _, entry_size in self._entries.values())
+            while total > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                total -= evicted_size
+        return value
+
+
+def grid_scores(estimator, candidates, X, y, cv, scoring, n_jobs, search_options=None):
+    """Mean CV score of each candidate, in order, from one GridSearchCV without a refit"""
+    search = GridSearchCV(
+        estimator,
+        [{name: [value] for name, value in params.items()} for params in candidates],
+        cv=cv, scoring=scoring, n_jobs=n_jobs, refit=False, verbose=0,
+        **(search_options or {})
+    )
+    try:
+        search.fit(X, y)
+    except ValueError as e:
+        # A chunk where every setting is invalid (e.g. an unsupported solver/penalty pair)
+        if "fits failed" not in str(e):
+            raise
+        return np.full(len(candidates), np.nan)
+    return search.cv_results_["mean_test_score"]
+
+
+def _halving_rounds(n_candidates, n_samples, min_samples, factor):
+    """Training-set size of each successive-halving round, smallest first"""
+    n_rounds = 1 + int(math.floor(math.log(max(n_candidates, 1), factor)))
+    smallest = max(min_samples, n_samples // factor ** (n_rounds - 1))
+    rounds = []
+    for r in range(n_rounds):
+        rounds.append(min(n_samples, smallest * factor ** r))
+        if rounds[-1] == n_samples:
+            break
+    return rounds
+
+
+def budgeted_search(estimator, candidates, X, y, strategy="Exhaustive grid", n_jobs=1, budget=None,
+                    report=None, cv=5, scoring="accuracy", random_state=0, search_options=None,
+                    score_candidates=grid_scores):
+    """CV search over candidates in chunks, stopping once the wall-clock budget (s) is spent
+
+    Successive halving scores every candidate on a small stratified subsample and keeps the
+    best 1/3 for each round on 3x more samples. After every chunk report (if given) receives
+    the best score and settings so far. score_candidates(estimator, candidates, X, y, cv,
+    scoring, n_jobs, search_options) returns one mean CV score per candidate and may be
+    swapped for a specialised engine. Engines marked whole_sweep = True score a whole round
+    in one vectorized pass, so they receive every remaining candidate in a single call.
+
+    Returns the best settings, their CV score, the number of candidate evaluations and
+    whether the budget cut the search short.
+    """
+    started = time.perf_counter()
+    whole_sweep = getattr(score_candidates, "whole_sweep", False)
+    y = np.asarray(y)
+    n_classes = np.unique(y).size
+    if strategy == "Successive halving":
+        rounds = _halving_rounds(len(candidates), len(y), 2 * cv * n_classes, HALVING_FACTOR)
+    else:
+        rounds = [len(y)]
+
+    remaining = list(candidates)
+    best_params, best_score, n_evaluated, stopped = candidates[0], np.nan, 0, False
+    for round_index, n_samples in enumerate(rounds):
+        if n_samples < len(y):
+            X_round, _, y_round, _ = train_test_split(
+                X, y, train_size=n_samples, stratify=y, random_state=random_state
+            )
+        else:
+            X_round, y_round = X, y
+
+        # Unscored candidates keep -inf so they rank last if the budget runs out mid-round
+        scores = np.full(len(remaining), -np.inf)
+        chunk_size = len(remaining) if whole_sweep else max(8, 4 * n_jobs)
+        for start in range(0, len(remaining), chunk_size):
+            if budget and n_evaluated and time.perf_counter() - started > budget:
+                stopped = True
+                break
+            chunk = remaining[start:start + chunk_size]
+            chunk_scores = score_candidates(estimator, chunk, X_round, y_round, cv, scoring, n_jobs, search_options)
+            scores[start:start + len(chunk)] = np.nan_to_num(chunk_scores, nan=-np.inf)
+            n_evaluated += len(chunk)
+            if report:
+                leader = int(np.argmax(scores))
+                report({
+                    "best_score": float(scores[leader]),
+                    "best_params": remaining[leader],
+                    "evaluated": n_evaluated,
+                    "round": f"{round_index + 1}/{len(rounds)} on {n_samples} samples",
+                    "elapsed": time.perf_counter() - started,
+                })
+
+        order = np.argsort(-scores, kind="stable")
+        if np.isfinite(scores[order[0]]):
+            best_params, best_score = remaining[order[0]], float(scores[order[0]])
+        if stopped:
+            break
+        remaining = [remaining[i] for i in order[:max(1, math.ceil(len(remaining) / HALVING_FACTOR))]]
+
+    return best_params, best_score, n_evaluated, stopped
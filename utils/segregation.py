@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+import pandas as pd
+
+ID_COLUMN = "Ensembl_ID"
+RACE_COLUMN = "race.demographic"
+
+
+def read_header(counts_path):
+    """Reads only the column names of the counts file"""
+    return pd.read_csv(counts_path, nrows=0).columns
+
+
+def matched_columns(sample_ids, header):
+    """Ensembl_ID plus the sample columns present in the counts header, in phenotype order"""
+    available = set(header[1:])
+    return [ID_COLUMN] + [sample for sample in sample_ids if sample in available]
+
+
+def partition_by_race(phenotype):
+    """Groups the phenotype sample IDs by normalized race in a single pass"""
+    race = phenotype[RACE_COLUMN].str.strip().str.lower()
+    sample_ids = phenotype.iloc[:, 0]
+    return {name: group.tolist() for name, group in sample_ids.groupby(race, sort=True)}
+
+
+def stream_partitions(counts_path, partitions, chunksize=5000):
+    """Writes every {output_path: sample_ids} partition from one chunked pass over the counts file
+
+    Outputs appear atomically once the pass has finished.
+    """
+    header = read_header(counts_path)
+    columns = {path: matched_columns(ids, header) for path, ids in partitions.items()}
+    wanted = set().union(*columns.values()) if columns else {ID_COLUMN}
+    reader = pd.read_csv(counts_path, usecols=lambda col: col in wanted, chunksize=chunksize)
+
+    # Each output is written to a temporary file and renamed when complete, so readers never see a partial file
+    temp_paths = {
+        path: tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+        for path in columns
+    }
+    outputs = {path: os.fdopen(fd, "w", newline="") for path, (fd, _) in temp_paths.items()}
+    try:
+        write_header = True
+        for chunk in reader:
+            for path, cols in columns.items():
+                chunk[cols].to_csv(outputs[path], index=False, header=write_header)
+            write_header = False
+        if write_header:
+            for path, cols in columns.items():
+                pd.DataFrame(columns=cols).to_csv(outputs[path], index=False)
+    except BaseException:
+        for path, (_, temp_path) in temp_paths.items():
+            outputs[path].close()
+            os.remove(temp_path)
+        raise
+    for path, (_, temp_path) in temp_paths.items():
+        outputs[path].close()
+        os.replace(temp_path, path)
+    return list(columns)
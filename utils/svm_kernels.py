@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.svm import SVC
+
+from utils.search import EngineCache, content_key, grid_scores
+
+KERNELS = ("linear", "poly", "rbf", "sigmoid")
+KERNEL_PARAMS = ("kernel", "gamma", "coef0", "degree")
+
+# Gram matrices by content of the matrix being searched, shared by its chunks
+_gram_cache = EngineCache()
+
+
+def _gram(X, dtype):
+    """X @ X.T of the samples in dtype"""
+    X_cast = np.asarray(X, dtype=dtype)
+    return X_cast @ X_cast.T
+
+
+def _resolve_gamma(gamma, X_train):
+    if gamma == "scale":
+        variance = np.asarray(X_train, dtype=np.float64).var()
+        return 1.0 / (X_train.shape[1] * variance) if variance != 0 else 1.0
+    if gamma == "auto":
+        return 1.0 / X_train.shape[1]
+    return gamma
+
+
+def kernel_from_gram(gram, sq_rows, sq_cols, kernel, gamma, coef0, degree):
+    """SVC kernel values from the dot products (and squared norms) of the two sample sets"""
+    if kernel == "linear":
+        values = gram
+    elif kernel == "poly":
+        values = (gamma * gram + coef0) ** degree
+    elif kernel == "rbf":
+        distances = sq_rows[:, None] + sq_cols[None, :] - 2 * gram
+        values = np.exp(-gamma * np.maximum(distances, 0))
+    else:
+        values = np.tanh(gamma * gram + coef0)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _kernel_key(params):
+    """The settings the kernel matrix depends on; everything else can share one Gram per fold"""
+    kernel = params["kernel"]
+    if kernel == "linear":
+        return ("linear",)
+    if kernel == "rbf":
+        return ("rbf", params["gamma"])
+    if kernel == "sigmoid":
+        return ("sigmoid", params["gamma"], params["coef0"])
+    return ("poly", params["gamma"], params["coef0"], params["degree"])
+
+
+def svm_kernel_scores(estimator, candidates, X, y, cv, scoring, n_jobs, search_options=None, dtype=np.float64):
+    """Mean CV accuracy of SVC settings from one Gram matrix per fold and kernel setting
+
+    Drop-in score_candidates for budgeted_search. The samples' dot products are computed
+    once with BLAS; each fold's kernel matrix is derived once per kernel/gamma/coef0/degree
+    and shared by every C and class_weight fitted with kernel='precomputed'. Platt scaling
+    does not change predict, so probability is skipped while scoring. Other scorers and
+    callable kernels fall back to GridSearchCV.
+    """
+    settings = [{**estimator.get_params(), **params} for params in candidates]
+    if scoring != "accuracy" or any(params["kernel"] not in KERNELS for params in settings):
+        return grid_scores(estimator, candidates, X, y, cv, scoring, n_jobs, search_options)
+
+    y = np.asarray(y)
+    X = np.asarray(X)
+    gram = _gram_cache.get(content_key(X, np.dtype(dtype).str), lambda: _gram(X, dtype))
+    sq_norms = np.diag(gram).astype(np.float64)
+    folds = list(StratifiedKFold(n_splits=cv).split(np.zeros(len(y)), y))
+
+    groups = {}
+    for index, params in enumerate(settings):
+        groups.setdefault(_kernel_key(params), []).append(index)
+
+    def score_group(fold, indices):
+        train, test = folds[fold]
+        params = settings[indices[0]]
+        gamma = _resolve_gamma(params["gamma"], X[train]) if params["kernel"] != "linear" else None
+        args = (params["kernel"], gamma, params["coef0"], params["degree"])
+        K_train = kernel_from_gram(gram[np.ix_(train, train)], sq_norms[train], sq_norms[train], *args)
+        K_test = kernel_from_gram(gram[np.ix_(test, train)], sq_norms[test], sq_norms[train], *args)
+        fold_scores = []
+        for index in indices:
+            svc_params = {k: v for k, v in settings[index].items() if k not in KERNEL_PARAMS}
+            model = SVC(**{**svc_params, "kernel": "precomputed", "probability": False})
+            try:
+                model.fit(K_train, y[train])
+                fold_scores.append(accuracy_score(y[test], model.predict(K_test)))
+            except ValueError:
+                fold_scores.append(np.nan)
+        return indices, fold_scores
+
+    scores = np.zeros((len(candidates), len(folds)))
+    tasks = [(fold, indices) for fold in range(len(folds)) for indices in groups.values()]
+    with ThreadPoolExecutor(max_workers=max(1, n_jobs)) as pool:
+        for (fold, _), (indices, fold_scores) in zip(tasks, pool.map(lambda task: score_group(*task), tasks)):
+            scores[indices, fold] = fold_scores
+    return scores.mean(axis=1)
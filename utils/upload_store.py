@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+STORE_DIR = os.environ.get("UPLOAD_STORE_DIR", os.path.join("temp", "uploads"))
+MAX_BYTES = int(float(os.environ.get("UPLOAD_STORE_MAX_GB", "5")) * 1024 ** 3)
+MAX_AGE_SECONDS = int(float(os.environ.get("UPLOAD_STORE_MAX_AGE_HOURS", "24")) * 3600)
+HASH_CHUNK = 8 * 1024 * 1024
+MAX_DIGEST_MEMO = 1024
+
+
+class UploadStore:
+    """Content-addressed store that keeps each distinct upload once on disk"""
+
+    def __init__(self, root=STORE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._digests = {}
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def lock(self):
+        """Held while files are added or evicted; hold it to open stored files safely"""
+        return self._lock
+
+    def digest(self, uploaded_file):
+        """SHA-256 of the upload, remembered per Streamlit file_id so reruns skip rehashing"""
+        file_id = getattr(uploaded_file, "file_id", None)
+        if file_id in self._digests:
+            return self._digests[file_id]
+
+        hasher = hashlib.sha256()
+        buffer = uploaded_file.getbuffer()
+        for start in range(0, len(buffer), HASH_CHUNK):
+            hasher.update(buffer[start:start + HASH_CHUNK])
+        digest = hasher.hexdigest()
+        if file_id is not None:
+            with self._lock:
+                self._digests[file_id] = digest
+                # Oldest file_ids go first; dicts keep insertion order
+                while len(self._digests) > MAX_DIGEST_MEMO:
+                    del self._digests[next(iter(self._digests))]
+        return digest
+
+    def path_for(self, digest, name):
+        return os.path.join(self.root, digest + os.path.splitext(name)[1].lower())
+
+    def put(self, uploaded_file):
+        """Stores the upload if its content is new and returns (digest, path)"""
+        digest = self.digest(uploaded_file)
+        path = self.path_for(digest, uploaded_file.name)
+
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(uploaded_file.getbuffer())
+                os.replace(tmp_path, path)
+            self._evict(keep=path)
+        return digest, path
+
+    def _evict(self, keep):
+        """Drops entries older than max_age, then least recently used ones until under max_bytes
+
+        Files sharing a digest prefix (an upload and its cached matrices) are evicted together,
+        and file_ids whose content is no longer stored are dropped from the digest memo.
+        """
+        keep_digest = os.path.basename(keep).split(".")[0]
+        now = time.time()
+        groups = {}
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or entry.name.endswith(".part"):
+                continue
+            stat = entry.stat()
+            group = groups.setdefault(entry.name.split(".")[0], [0.0, 0, []])
+            group[0] = max(group[0], stat.st_mtime)
+            group[1] += stat.st_size
+            group[2].append(entry.path)
+
+        kept, removed = [], set()
+        for digest, (mtime, size, paths) in groups.items():
+            if digest == keep_digest:
+                continue
+            if now - mtime > self.max_age:
+                self._remove(paths)
+                removed.add(digest)
+            else:
+                kept.append((mtime, size, digest, paths))
+
+        total = sum(size for _, size, _, _ in kept) + groups.get(keep_digest, [0, 0])[1]
+        for _, size, digest, paths in sorted(kept, key=lambda group: group[0]):
+            if total <= self.max_bytes:
+                break
+            self._remove(paths)
+            removed.add(digest)
+            total -= size
+
+        self._digests = {
+            file_id: digest for file_id, digest in self._digests.items()
+            if digest in groups and digest not in removed
+        }
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+@st.cache_resource
+def get_upload_store():
+    """One store shared by every page and session of the server"""
+    return UploadStore()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _read_stored(digest, path):
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path, engine="openpyxl")
+    return pd.read_csv(path)
+
+
+def store_upload(uploaded_file):
+    """Path of the upload's content-addressed copy on disk"""
+    return get_upload_store().put(uploaded_file)[1]
+
+
+def load_upload(uploaded_file):
+    """Parsed frame of the upload, shared across pages and users with the same content"""
+    digest, path = get_upload_store().put(uploaded_file)
+    return _read_stored(digest, path)